@@ -0,0 +1,60 @@
+import threading
+
+# Connections kept open per host by the shared HTTP session
+HTTP_POOL_SIZE = 32
+
+_lock = threading.Lock()
+_http_session = None
+_openai_clients = {}
+
+
+def get_http_session():
+    """
+    Returns the process-wide, connection-pooled HTTP session.
+
+    Reusing one session keeps TCP/TLS connections to the image CDN alive across
+    downloads and render jobs.
+
+    Returns:
+        requests.Session: Shared session
+    """
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def get_openai_client(api_key):
+    """
+    Returns a shared OpenAI client for an API key.
+
+    The client owns a pooled HTTP connection, so reusing it across generators and
+    jobs avoids a new handshake per job.
+
+    Args:
+        api_key (str): OpenAI API key
+
+    Returns:
+        OpenAI: Client instance, or None without a key
+    """
+    if not api_key:
+        return None
+
+    with _lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            # The SDK is only loaded once a client is actually needed
+            from openai import OpenAI
+
+            # Retries are handled by the request scheduler, which also paces requests per key
+            client = OpenAI(api_key=api_key, max_retries=0)
+            _openai_clients[api_key] = client
+        return client
@@ -5,15 +5,18 @@ import tempfile
 from datetime import datetime
 from streamlit_option_menu import option_menu
 from prompt_generator import generate_animal_story, save_story_to_json, generate_animal_story_with_client
-# Removed old video_generator imports - now using unified_video_generator
-from video_generator import (
-    generate_video_ui
-)
+from api_clients import get_openai_client
+from render_queue import RenderQueue, ensure_workers
+from output_catalog import OutputCatalog, preview_paths
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Output catalog settings
+CATALOG_REFRESH_SECONDS = 10
+FILES_PER_PAGE = 20
+
 # Page configuration
 st.set_page_config(
     page_title="Animal Life Video Creator",
@@ -60,6 +63,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_render_queue():
+    """Shared handle to the background render queue"""
+    return RenderQueue()
+
+@st.cache_resource
+def get_output_catalog():
+    """Shared index of the stories and videos in the output folder"""
+    return OutputCatalog()
+
 def check_api_keys():
     """Check and manage API keys for different services"""
     with st.sidebar:
@@ -83,8 +96,7 @@ def check_api_keys():
             if st.button("💾 Save OpenAI", key="save_openai"):
                 if openai_input.startswith('sk-'):
                     st.session_state.openai_api_key = openai_input
-                    from openai import OpenAI
-                    st.session_state.openai_client = OpenAI(api_key=openai_input)
+                    st.session_state.openai_client = get_openai_client(openai_input)
                     st.success("✅ OpenAI API key saved!")
                     st.rerun()
                 else:
@@ -98,8 +110,7 @@ def check_api_keys():
     
     # Initialize OpenAI client if key is available
     if openai_key and not hasattr(st.session_state, 'openai_client'):
-        from openai import OpenAI
-        st.session_state.openai_client = OpenAI(api_key=openai_key)
+        st.session_state.openai_client = get_openai_client(openai_key)
     
     return openai_key
 
@@ -189,23 +200,40 @@ def story_creation_page():
                 help="How many scenes do you want in your story?"
             )
             
+            fresh_story = st.checkbox(
+                "🔄 Write a new story",
+                value=False,
+                help="Ignore previously generated stories for the same animal and scene count"
+            )
+            
+            render_now = st.checkbox(
+                "🎬 Also create the video",
+                value=False,
+                help="Start generating images and audio while the story is still being written"
+            )
+            
             submitted = st.form_submit_button("✨ Create Story", type="primary")
             
             if submitted:
-                if animal_name:
-                    create_story(animal_name, num_scenes, model_option)
-                else:
+                if not animal_name:
                     st.error("Please enter an animal name!")
+                elif render_now:
+                    create_story_with_video(animal_name, num_scenes, force_refresh=fresh_story)
+                else:
+                    create_story(animal_name, num_scenes, model_option, force_refresh=fresh_story)
     
     with col2:
         st.markdown("### 📊 Cost Estimate")
         cost_estimate = num_scenes * 0.027  # Approximate cost per scene
         st.metric("Estimated Cost", f"${cost_estimate:.3f}")
+        render_jobs_panel()
 
-def create_story(animal_name, num_scenes, model="openai"):
-    """Create story with progress tracking"""
+def create_story(animal_name, num_scenes, model="openai", force_refresh=False):
+    """Create story with progress tracking; returns the saved story file, or None"""
     progress_bar = st.progress(0)
     status_text = st.empty()
+    story_data = None
+    filepath = None
     
     try:
         if model == "openai":
@@ -214,7 +242,7 @@ def create_story(animal_name, num_scenes, model="openai"):
             
             # Generate story using OpenAI
             client = st.session_state.openai_client
-            story_data = generate_animal_story_with_client(client, animal_name, num_scenes)
+            story_data = generate_animal_story_with_client(client, animal_name, num_scenes, force_refresh=force_refresh)
             
             if story_data:
                 progress_bar.progress(75)
@@ -227,6 +255,7 @@ def create_story(animal_name, num_scenes, model="openai"):
                 os.makedirs(output_dir, exist_ok=True)
                 filepath = os.path.join(output_dir, filename)
                 save_story_to_json(story_data, filepath)
+                get_output_catalog().add(filepath)
         
         if story_data:
             progress_bar.progress(100)
@@ -242,7 +271,7 @@ def create_story(animal_name, num_scenes, model="openai"):
                 st.json(story_data)
                 
             # Download button
-            file_to_read = filename if isinstance(filename, str) else filepath
+            file_to_read = filepath
             with open(file_to_read, 'r', encoding='utf-8') as f:
                 st.download_button(
                     label="📥 Download JSON File",
@@ -251,13 +280,32 @@ def create_story(animal_name, num_scenes, model="openai"):
                     mime="application/json"
                 )
         else:
-            st.error(f"Could not create story ({model_name}). Please try again.")
+            st.error("Could not create story (OpenAI GPT-4). Please try again.")
             
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
+        filepath = None
     finally:
         progress_bar.empty()
         status_text.empty()
+    
+    return filepath if story_data else None
+
+def create_story_with_video(animal_name, num_scenes, voice="alloy", force_refresh=False):
+    """Queue a job that writes the story and renders each scene as soon as it is written"""
+    try:
+        platform_specs = {'width': 1024, 'height': 1792, 'ratio': '9:16', 'max_duration': 120}
+        openai_key = st.session_state.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
+        
+        queue = get_render_queue()
+        job_id = queue.submit_story(animal_name, num_scenes, voice, platform_specs, openai_key, force_refresh)
+        ensure_workers(openai_key)
+        
+        st.session_state.setdefault('render_jobs', []).append(job_id)
+        st.success(f"🎬 Story and video queued! Job: {job_id}")
+        
+    except Exception as e:
+        st.error(f"Video creation error: {str(e)}")
 
 def video_generation_page():
     """Video generation page"""
@@ -302,11 +350,10 @@ def video_generation_page():
             return
         
         # File selection
-        output_dir = "output"
-        json_files = []
-        
-        if os.path.exists(output_dir):
-            json_files = [f for f in os.listdir(output_dir) if f.endswith('.json')]
+        catalog = get_output_catalog()
+        catalog.refresh(min_interval=CATALOG_REFRESH_SECONDS)
+        story_paths = {row['name']: row['path'] for row in catalog.list_files("story", page_size=None)}
+        json_files = list(story_paths)
         
         if json_files:
             selected_file = st.selectbox(
@@ -353,7 +400,7 @@ def video_generation_page():
                         json.dump(json.load(uploaded_file), tmp_file)
                         file_to_process = tmp_file.name
                 elif selected_file:
-                    file_to_process = os.path.join(output_dir, selected_file)
+                    file_to_process = story_paths[selected_file]
                 
                 if file_to_process:
                     generate_video(file_to_process, selected_voice)
@@ -363,149 +410,148 @@ def video_generation_page():
             st.warning("📁 No JSON story files found. First create a story from the 'Create Story' tab.")
     
     with col2:
-        pass  # Tips section removed
+        render_jobs_panel()
 
-def generate_video(story_file, voice):
-    """Generate video with progress tracking using video generator"""
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
+def generate_video(story_file, voice, platform_specs=None):
+    """Queue a video render; a background worker picks it up and the page polls its status"""
     try:
         # Get platform specs from session state
-        platform_specs = st.session_state.get('platform_specs', {'width': 1024, 'height': 1792})
+        platform_specs = platform_specs or st.session_state.get('platform_specs', {'width': 1024, 'height': 1792})
         
         # Get OpenAI API key
         openai_key = st.session_state.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
         
-        # Generate video using video generator
-        final_video_path, success, story_data = generate_video_ui(
-            story_file, voice, platform_specs, openai_key, 
-            progress_callback=progress_bar.progress,
-            status_callback=status_text.text
-        )
+        queue = get_render_queue()
+        job_id = queue.submit(story_file, voice, platform_specs, openai_key)
+        ensure_workers(openai_key)
+        
+        st.session_state.setdefault('render_jobs', []).append(job_id)
+        st.success(f"🎬 Video queued! Job: {job_id}")
         
-        if success and final_video_path and os.path.exists(final_video_path):
-            # Display success message
-            st.markdown(f'<div class="success-box">🎉 <strong>{story_data["story_title"]}</strong> video created!<br>📁 File: {final_video_path}</div>', unsafe_allow_html=True)
-            
-            # Video info
-            total_duration = story_data.get('total_duration', len(story_data['scenes']) * 8)
-            st.markdown(f"""
-            **📊 Video Information:**
-            - 🎬 Scene count: {len(story_data['scenes'])}
-            - ⏱️ Total duration: {total_duration} seconds
-            - 📐 Size: {platform_specs['width']}x{platform_specs['height']} px ({platform_specs.get('ratio', 'N/A')})
-            - 🤖 Model: OpenAI DALL-E + TTS (Video Generator)
-            - 📁 File path: {final_video_path}
-            """)
-            
-            # Show video player
-            if os.path.exists(final_video_path):
-                st.video(final_video_path)
-            
-            # Download button
-            with open(final_video_path, 'rb') as f:
-                st.download_button(
-                    label="📥 Download Video File",
-                    data=f.read(),
-                    file_name=os.path.basename(final_video_path),
-                    mime="video/mp4"
-                )
-        else:
-            st.error("Could not create video. Please check your API key and try again.")
-            
     except Exception as e:
         st.error(f"Video creation error: {str(e)}")
-    finally:
-        progress_bar.empty()
-        status_text.empty()
 
+def render_jobs_panel():
+    """Shows the status of the render jobs submitted in this session"""
+    job_ids = st.session_state.get('render_jobs', [])
+    if not job_ids:
+        return
+    
+    st.markdown("### 📋 Render Jobs")
+    if st.button("🔄 Refresh Status", key="refresh_render_jobs"):
+        st.rerun()
+    
+    queue = get_render_queue()
+    status_icons = {"queued": "⏳", "running": "⚙️", "succeeded": "✅", "failed": "❌"}
+    
+    for job in queue.list_jobs(job_ids):
+        icon = status_icons.get(job['status'], "❔")
+        with st.expander(f"{icon} {job['id']} ({job['status']})", expanded=job['status'] == 'succeeded'):
+            if job['status'] == 'queued':
+                st.write(f"Waiting for a render slot, {queue.queue_position(job['id'])} job(s) ahead.")
+            elif job['status'] == 'running':
+                st.write(f"Rendering since {job['started_at'][:19]}...")
+            elif job['status'] == 'failed':
+                st.error(job['error'] or "Could not create video. Please check your API key and try again.")
+            elif job['output_file'] and os.path.exists(job['output_file']):
+                if job.get('animal'):
+                    st.write(f"📖 Story: {job['story_file']}")
+                st.write(f"📁 File: {job['output_file']}")
+                show_video_preview(job['output_file'])
+                lazy_download_button({'path': job['output_file'], 'name': os.path.basename(job['output_file'])}, "video/mp4")
 
+def paginate(kind, catalog, label):
+    """Shows a page selector and returns the rows of the selected page"""
+    total = catalog.count(kind)
+    pages = max(1, -(-total // FILES_PER_PAGE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"page_{kind}") - 1
+    st.caption(f"{total} {label}")
+    return catalog.list_files(kind, page, FILES_PER_PAGE)
 
+def lazy_download_button(row, mime):
+    """Reads a file only after the user asks to download it"""
+    prepare_key = f"prepare_{row['path']}"
+    if not st.session_state.get(prepare_key):
+        if st.button("📥 Download", key=f"ask_{row['path']}"):
+            st.session_state[prepare_key] = True
+            st.rerun()
+        return
+    
+    with open(row['path'], 'rb') as f:
+        st.download_button(
+            "💾 Save File",
+            f,
+            file_name=row['name'],
+            mime=mime,
+            key=f"download_{row['path']}"
+        )
+    # The button holds the file for this run only; later reruns go back to the cheap button
+    del st.session_state[prepare_key]
 
+def show_video_preview(video_file):
+    """Shows the poster of a video and plays its low-bitrate preview on request"""
+    poster_file, preview_file = preview_paths(video_file)
+    if os.path.exists(poster_file):
+        st.image(poster_file, width=240)
+    
+    if st.checkbox("▶️ Play Preview", key=f"play_{video_file}"):
+        # Older renders have no preview; fall back to the full file
+        st.video(preview_file if os.path.exists(preview_file) else video_file)
 
 def file_management_page():
     """File management page"""
     st.markdown('<h2 class="sub-header">📁 File Management</h2>', unsafe_allow_html=True)
     
+    catalog = get_output_catalog()
+    catalog.refresh(min_interval=CATALOG_REFRESH_SECONDS)
+    if st.button("🔄 Rescan Output Folder"):
+        catalog.refresh()
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 📄 JSON Story Files")
-        output_dir = "output"
+        rows = paginate("story", catalog, "story files")
         
-        if os.path.exists(output_dir):
-            json_files = [f for f in os.listdir(output_dir) if f.endswith('.json')]
-            
-            if json_files:
-                for file in json_files:
-                    file_path = os.path.join(output_dir, file)
-                    with st.expander(f"📖 {file}"):
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                data = json.load(f)
-                            
-                            st.write(f"**Title:** {data.get('story_title', 'N/A')}")
-                            st.write(f"**Scene count:** {len(data.get('scenes', []))}")
-                            st.write(f"**Total duration:** {data.get('total_duration', 'N/A')} seconds")
-                            
-                            col_a, col_b = st.columns(2)
-                            with col_a:
-                                with open(file_path, 'r', encoding='utf-8') as f:
-                                    st.download_button(
-                                        "📥 Download",
-                                        f.read(),
-                                        file_name=file,
-                                        mime="application/json",
-                                        key=f"download_{file}"
-                                    )
-                            with col_b:
-                                if st.button("🗑️ Delete", key=f"delete_{file}"):
-                                    os.remove(file_path)
-                                    st.rerun()
-                        except Exception as e:
-                            st.error(f"Could not read file: {str(e)}")
-            else:
-                st.info("No JSON story files yet.")
+        if rows:
+            for row in rows:
+                with st.expander(f"📖 {row['name']}"):
+                    st.write(f"**Title:** {row['title'] or 'N/A'}")
+                    st.write(f"**Scene count:** {row['scene_count'] if row['scene_count'] is not None else 'N/A'}")
+                    st.write(f"**Total duration:** {row['duration'] if row['duration'] is not None else 'N/A'} seconds")
+                    
+                    col_a, col_b = st.columns(2)
+                    with col_a:
+                        lazy_download_button(row, "application/json")
+                    with col_b:
+                        if st.button("🗑️ Delete", key=f"delete_{row['path']}"):
+                            catalog.remove(row['path'])
+                            st.rerun()
         else:
-            st.info("Output folder not found.")
+            st.info("No JSON story files yet.")
     
     with col2:
         st.markdown("### 🎥 Video Files")
-        output_dir = "output"
+        rows = paginate("video", catalog, "video files")
         
-        if os.path.exists(output_dir):
-            video_files = [f for f in os.listdir(output_dir) if f.endswith('.mp4')]
-            
-            if video_files:
-                for file in video_files:
-                    file_path = os.path.join(output_dir, file)
-                    file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
+        if rows:
+            for row in rows:
+                with st.expander(f"🎬 {row['name']}"):
+                    st.write(f"**File size:** {row['size'] / (1024 * 1024):.1f} MB")
+                    if row['duration']:
+                        st.write(f"**Duration:** {row['duration']:.1f} seconds")
                     
-                    with st.expander(f"🎬 {file}"):
-                        st.write(f"**File size:** {file_size:.1f} MB")
-                        
-                        col_a, col_b = st.columns(2)
-                        with col_a:
-                            with open(file_path, 'rb') as f:
-                                st.download_button(
-                                    "📥 Download",
-                                    f.read(),
-                                    file_name=file,
-                                    mime="video/mp4",
-                                    key=f"download_video_{file}"
-                                )
-                        with col_b:
-                            if st.button("🗑️ Delete", key=f"delete_video_{file}"):
-                                os.remove(file_path)
-                                st.rerun()
-                        
-                        # Show video preview
-                        st.video(file_path)
-            else:
-                st.info("No video files yet.")
+                    col_a, col_b = st.columns(2)
+                    with col_a:
+                        lazy_download_button(row, "video/mp4")
+                    with col_b:
+                        if st.button("🗑️ Delete", key=f"delete_video_{row['path']}"):
+                            catalog.remove(row['path'])
+                            st.rerun()
+                    
+                    show_video_preview(row['path'])
         else:
-            st.info("Output folder not found.")
+            st.info("No video files yet.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import os
+import json
+import hashlib
+import threading
+import metrics
+
+
+class AssetCache:
+    """Content-addressed file cache with a disk-size budget and LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, name=None):
+        """
+        Initialize the cache.
+
+        Entries are plain files named after their key. The file modification time
+        is used as the last-access time, so several processes can share one cache
+        directory without a shared index.
+
+        Args:
+            cache_dir (str): Directory the cached files are stored in
+            max_bytes (int): Disk budget; least recently used files are evicted above it
+            name (str): Cache label in metrics, defaults to the directory name
+        """
+        self.cache_dir = cache_dir
+        self.name = name or os.path.basename(os.path.normpath(cache_dir))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Build a cache key from the inputs that determine an asset.
+
+        Args:
+            *parts: JSON-serializable values (model, prompt, size, ...)
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key, extension):
+        """Return the file path used for a key."""
+        return os.path.join(self.cache_dir, f"{key}{extension}")
+
+    def get(self, key, extension, count=False):
+        """
+        Look up a cached file and mark it as recently used.
+
+        Args:
+            key (str): Cache key
+            extension (str): File extension, e.g. ".png"
+            count (bool): Record the lookup in the hit/miss counters
+
+        Returns:
+            str: Cached file path, or None on a miss
+        """
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path, None)
+        except OSError:
+            path = None
+
+        if count:
+            self.record_lookup(path is not None)
+        return path
+
+    def record_lookup(self, hit):
+        """Count a lookup answered from (hit) or not answered from (miss) the cache."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.increment("cache_lookups_total", cache=self.name, result="hit" if hit else "miss")
+
+    def get_or_create(self, key, extension, producer, refresh=False):
+        """
+        Return the cached file for a key, creating it with producer on a miss.
+
+        Concurrent calls for the same key wait for the first one, so an asset is
+        only produced once even when it is requested several times at once.
+
+        Args:
+            key (str): Cache key
+            extension (str): File extension, e.g. ".png"
+            producer (callable): Called with a temporary path, writes the asset
+                there and returns True on success
+            refresh (bool): Ignore and replace an existing entry
+
+        Returns:
+            str: Cached file path, or None if the producer failed
+        """
+        # Per-key locks are reference-counted so they are dropped once no call waits on them
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                return self._get_or_produce(key, extension, producer, refresh)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _get_or_produce(self, key, extension, producer, refresh):
+        if refresh:
+            self.record_lookup(False)
+        else:
+            path = self.get(key, extension, count=True)
+            if path:
+                return path
+
+        tmp_path = f"{self.path_for(key, extension)}.{os.getpid()}.{threading.get_ident()}.tmp{extension}"
+        try:
+            if not producer(tmp_path) or not os.path.exists(tmp_path):
+                return None
+            return self.put(key, extension, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put(self, key, extension, source_file):
+        """
+        Move a finished file into the cache.
+
+        Args:
+            key (str): Cache key
+            extension (str): File extension, e.g. ".png"
+            source_file (str): File to move into the cache
+
+        Returns:
+            str: Cached file path
+        """
+        path = self.path_for(key, extension)
+        size = os.path.getsize(source_file)
+        replaced_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(source_file, path)
+
+        with self._lock:
+            self._total_bytes += size - replaced_size
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def contains(self, path):
+        """Return True if a path points into this cache."""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)
+
+    def meta_path(self, path):
+        """Return the metadata sidecar path of a cached file."""
+        return f"{os.path.splitext(path)[0]}.meta.json"
+
+    def read_meta(self, path):
+        """
+        Read the metadata stored alongside a cached file.
+
+        Args:
+            path (str): Cached file path
+
+        Returns:
+            dict: Stored metadata, empty if there is none
+        """
+        try:
+            with open(self.meta_path(path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_meta(self, path, meta):
+        """
+        Store metadata (e.g. a probed duration) alongside a cached file.
+
+        Args:
+            path (str): Cached file path
+            meta (dict): JSON-serializable metadata
+        """
+        meta_path = self.meta_path(path)
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def stats(self):
+        """
+        Return cache usage counters.
+
+        Returns:
+            dict: hits, misses, hit_rate and bytes currently stored
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self._total_bytes
+            }
+
+    def _scan(self):
+        """List cached files as (path, size, mtime) tuples."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if '.tmp' in name or name.endswith('.meta.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self, keep=None):
+        """Delete least recently used files until the cache fits its budget."""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+            if os.path.exists(self.meta_path(path)):
+                os.remove(self.meta_path(path))
+
+        self._total_bytes = total
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import metrics
+from api_clients import get_openai_client
+from prompt_generator import StoryStream, generate_animal_story_with_client, save_story_to_json
+from video_generator import ImageBasedVideoGenerator, available_cpus
+
+# Load API key from .env file
+load_dotenv()
+
+DEFAULT_PLATFORM_SPECS = {'width': 1024, 'height': 1792, 'ratio': '9:16', 'max_duration': 120}
+
+
+def load_jobs(jobs_file):
+    """
+    Reads batch jobs from a JSONL file.
+
+    Each line is an object with "animal" (or an existing "story_file") and
+    optional "num_scenes", "voice", "platform_specs", "image_response_format"
+    and "job_id". A "targets" list of platform specs renders every aspect ratio
+    from one asset set.
+
+    Args:
+        jobs_file (str): JSONL file path
+
+    Returns:
+        list: Job dictionaries
+    """
+    jobs = []
+    with open(jobs_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            if not job.get("animal") and not job.get("story_file"):
+                raise ValueError(f"Job on line {line_number} needs an 'animal' or a 'story_file'")
+            if job.get("image_response_format", "url") not in ("url", "b64_json"):
+                raise ValueError(f"Job on line {line_number} has an unknown image_response_format")
+            job.setdefault("job_id", f"job_{line_number:04d}")
+            jobs.append(job)
+    return jobs
+
+
+class BatchRunner:
+    """Runs story generation, asset generation and rendering for many jobs with per-stage limits"""
+
+    def __init__(self, openai_api_key, output_dir="output/batch", story_concurrency=4, asset_concurrency=2,
+                 render_concurrency=1, max_requests_per_story=4, encode_workers=None, image_response_format="url"):
+        """
+        Initialize the batch runner.
+
+        Args:
+            openai_api_key (str): OpenAI API key
+            output_dir (str): Root directory; every job renders into its own subdirectory
+            story_concurrency (int): Stories generated at the same time
+            asset_concurrency (int): Stories whose images and narration are generated at the same time
+            render_concurrency (int): Stories encoded at the same time
+            max_requests_per_story (int): Image/TTS requests in flight per story
+            encode_workers (int): Encode processes per render, defaults to the cores split between renders
+            image_response_format (str): Image response format of jobs that do not set one, 'url' or 'b64_json'
+        """
+        self.openai_api_key = openai_api_key
+        self.output_dir = output_dir
+        self.story_slots = threading.Semaphore(story_concurrency)
+        self.asset_slots = threading.Semaphore(asset_concurrency)
+        self.encode_slots = threading.Semaphore(render_concurrency)
+        self.max_requests_per_story = max_requests_per_story
+        self.encode_workers = encode_workers or max(1, available_cpus() // render_concurrency)
+        self.image_response_format = image_response_format
+        self._generators = {}
+        self._generators_lock = threading.Lock()
+
+        # One generator for all jobs, so clients and caches are shared
+        self.generator = self.generator_for(image_response_format)
+
+    def generator_for(self, image_response_format):
+        """
+        Returns the generator of jobs with an image response format.
+
+        Generators share the stage limits, so jobs with different formats still
+        count against the same asset and render slots.
+
+        Args:
+            image_response_format (str): 'url' or 'b64_json'
+
+        Returns:
+            ImageBasedVideoGenerator: Shared generator
+        """
+        with self._generators_lock:
+            if image_response_format not in self._generators:
+                generator = ImageBasedVideoGenerator(
+                    self.openai_api_key,
+                    max_concurrency=self.max_requests_per_story,
+                    encode_workers=self.encode_workers,
+                    image_response_format=image_response_format
+                )
+                generator.story_slots = self.story_slots
+                generator.asset_slots = self.asset_slots
+                generator.encode_slots = self.encode_slots
+                if self._generators:
+                    # Asset keys do not depend on the format; share the caches so their counters stay together
+                    shared = next(iter(self._generators.values()))
+                    for name in ("image_cache", "audio_cache", "prepared_cache", "segment_cache"):
+                        setattr(generator, name, getattr(shared, name))
+                self._generators[image_response_format] = generator
+            return self._generators[image_response_format]
+
+    def run_job(self, job):
+        """
+        Runs one job end to end.
+
+        Args:
+            job (dict): Job description
+
+        Returns:
+            dict: Job report with status, output paths, stage timings and error
+        """
+        job_dir = os.path.join(self.output_dir, job["job_id"])
+        report = {
+            "job_id": job["job_id"],
+            "animal": job.get("animal"),
+            "status": "failed",
+            "story_file": job.get("story_file"),
+            "video_file": None,
+            "timings": {},
+            "error": None
+        }
+        job_start = time.perf_counter()
+
+        try:
+            os.makedirs(job_dir, exist_ok=True)
+            generator = self.generator_for(job.get("image_response_format", self.image_response_format))
+
+            # Single-target jobs stream their story, so each scene's assets start as soon as it arrives
+            if not report["story_file"] and not job.get("targets"):
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                story_file = os.path.join(job_dir, f"{job['animal'].lower()}_openai_{timestamp}.json")
+                story_stream = StoryStream(get_openai_client(self.openai_api_key), job["animal"],
+                                           job.get("num_scenes", 5))
+                video_file, success, story_data = generator.process_story_stream(
+                    story_stream, story_file, job_dir, job.get("voice", "alloy"),
+                    job.get("platform_specs", DEFAULT_PLATFORM_SPECS), timings=report["timings"]
+                )
+                if not story_data:
+                    raise RuntimeError("Story generation failed")
+                report["story_file"] = story_file
+                if not success:
+                    raise RuntimeError("Video rendering failed")
+                report["video_file"] = video_file
+            else:
+                # Story stage
+                if not report["story_file"]:
+                    with self.story_slots:
+                        stage_start = time.perf_counter()
+                        client = get_openai_client(self.openai_api_key)
+                        story_data = generate_animal_story_with_client(client, job["animal"], job.get("num_scenes", 5))
+                        report["timings"]["story"] = time.perf_counter() - stage_start
+
+                    if not story_data:
+                        raise RuntimeError("Story generation failed")
+
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    report["story_file"] = os.path.join(job_dir, f"{job['animal'].lower()}_openai_{timestamp}.json")
+                    save_story_to_json(story_data, report["story_file"])
+
+                # Asset and render stages
+                if job.get("targets"):
+                    stage_start = time.perf_counter()
+                    report["video_files"] = generator.process_story_to_video_multi(
+                        report["story_file"], job_dir, job.get("voice", "alloy"), job["targets"]
+                    )
+                    report["timings"]["render"] = time.perf_counter() - stage_start
+                    if not all(report["video_files"].values()):
+                        raise RuntimeError("Video rendering failed for some targets")
+                else:
+                    video_file, success = generator.process_story_to_video(
+                        report["story_file"], job_dir, job.get("voice", "alloy"),
+                        job.get("platform_specs", DEFAULT_PLATFORM_SPECS), timings=report["timings"]
+                    )
+                    if not success:
+                        raise RuntimeError("Video rendering failed")
+                    report["video_file"] = video_file
+
+            report["status"] = "succeeded"
+        except Exception as e:
+            report["error"] = str(e)
+            print(f"Batch job {job['job_id']} failed: {str(e)}")
+
+        report["timings"]["total"] = time.perf_counter() - job_start
+        report["timings"] = {stage: round(seconds, 3) for stage, seconds in report["timings"].items()}
+        return report
+
+    def run(self, jobs, max_jobs=8):
+        """
+        Runs many jobs concurrently, bounded by the per-stage limits.
+
+        Args:
+            jobs (list): Job descriptions
+            max_jobs (int): Jobs in progress at the same time
+
+        Returns:
+            dict: Summary report with per-job results
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, max_jobs)) as executor:
+            results = list(executor.map(self.run_job, jobs))
+
+        succeeded = sum(1 for result in results if result["status"] == "succeeded")
+        metrics.export()
+        return {
+            "total_jobs": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "wall_seconds": round(time.perf_counter() - start, 3),
+            "image_cache": self.generator.image_cache.stats(),
+            "audio_cache": self.generator.audio_cache.stats(),
+            "metrics": metrics.snapshot(),
+            "jobs": results
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render many animal stories headlessly from a JSONL job file")
+    parser.add_argument("jobs_file", help="JSONL file with one job per line")
+    parser.add_argument("--output-dir", default=os.path.join("output", "batch"))
+    parser.add_argument("--report", help="Write the summary report to this JSON file")
+    parser.add_argument("--max-jobs", type=int, default=8, help="Jobs in progress at the same time")
+    parser.add_argument("--story-concurrency", type=int, default=4)
+    parser.add_argument("--asset-concurrency", type=int, default=2)
+    parser.add_argument("--render-concurrency", type=int, default=1)
+    parser.add_argument("--requests-per-story", type=int, default=4)
+    parser.add_argument("--encode-workers", type=int)
+    parser.add_argument("--image-response-format", choices=["url", "b64_json"], default="url",
+                        help="How jobs without their own image_response_format receive images")
+    args = parser.parse_args()
+
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    if not openai_api_key:
+        parser.error("OPENAI_API_KEY is not set")
+
+    runner = BatchRunner(
+        openai_api_key, args.output_dir, args.story_concurrency, args.asset_concurrency,
+        args.render_concurrency, args.requests_per_story, args.encode_workers, args.image_response_format
+    )
+    summary = runner.run(load_jobs(args.jobs_file), args.max_jobs)
+
+    report = json.dumps(summary, indent=2, ensure_ascii=False)
+    print(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report)
+
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,633 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+import metrics
+from api_clients import get_openai_client
+from openai_stub import OpenAIStubServer, DEFAULT_LATENCY
+from prompt_generator import generate_animal_story_with_client
+from video_generator import ImageBasedVideoGenerator, ENCODERS, MOTION_PRESETS, available_cpus, ffmpeg_binary
+
+PIPELINE_PLATFORM_SPECS = {'width': 1024, 'height': 1792, 'ratio': '9:16', 'max_duration': 120}
+
+
+def make_synthetic_scene(work_dir, index, seconds, width, height):
+    """
+    Creates a stand-in scene image and narration track.
+
+    Args:
+        work_dir (str): Directory for the generated files
+        index (int): Scene index, varies the image and tone
+        seconds (float): Narration length
+        width (int): Image width
+        height (int): Image height
+
+    Returns:
+        tuple: (image_file, audio_file)
+    """
+    image_file = os.path.join(work_dir, f"scene_{index}.png")
+    audio_file = os.path.join(work_dir, f"scene_{index}.wav")
+
+    # Gradient with noise so the encoder sees a realistic, non-trivial picture
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40 + index)
+    Image.merge("RGB", (gradient, noise, gradient.rotate(90 * index))).save(image_file)
+
+    command = [
+        ffmpeg_binary(), "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency={220 + 40 * index}:duration={seconds}",
+        "-ar", "24000", "-ac", "1", "-c:a", "pcm_s16le", audio_file
+    ]
+    subprocess.run(command, check=True, capture_output=True)
+    return image_file, audio_file
+
+
+def measure(function, *args, **kwargs):
+    """
+    Runs a function and measures its wall-clock and CPU time, including child processes.
+
+    Returns:
+        tuple: (result, wall_seconds, cpu_seconds)
+    """
+    start_times = os.times()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    wall = time.perf_counter() - start
+    end_times = os.times()
+
+    cpu = sum(getattr(end_times, field) - getattr(start_times, field)
+              for field in ("user", "system", "children_user", "children_system"))
+    return result, wall, cpu
+
+
+def benchmark_encoders(num_scenes=5, scene_seconds=10, width=1080, height=1920, encoders=ENCODERS, workers=None):
+    """
+    Compares the composition backends of ImageBasedVideoGenerator on synthetic scenes.
+
+    Args:
+        num_scenes (int): Number of scenes
+        scene_seconds (float): Narration length per scene
+        width (int): Video width
+        height (int): Video height
+        encoders (tuple): Encoders to compare
+        workers (tuple): Encode worker counts to compare, defaults to 1 and all cores
+
+    Returns:
+        dict: Encode and CPU seconds per encoder and worker count, absolute and per minute of output
+    """
+    workers = workers or sorted({1, available_cpus()})
+    results = {
+        "num_scenes": num_scenes,
+        "scene_seconds": scene_seconds,
+        "resolution": f"{width}x{height}",
+        "cpus": available_cpus(),
+        "encoders": {}
+    }
+    output_minutes = num_scenes * scene_seconds / 60
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        scene_assets = [make_synthetic_scene(work_dir, i, scene_seconds, width, height)
+                        for i in range(1, num_scenes + 1)]
+
+        for encoder in encoders:
+            for worker_count in workers:
+                # A cache per run, so no run reuses the segments of another
+                generator = ImageBasedVideoGenerator(cache_dir=os.path.join(work_dir, f"cache_{encoder}_{worker_count}"),
+                                                     encoder=encoder, encode_workers=worker_count)
+                output_file = os.path.join(work_dir, f"{encoder}_{worker_count}.mp4")
+                success, wall, cpu = measure(generator.compose_video, scene_assets, output_file)
+
+                results["encoders"][f"{encoder}/{worker_count}_workers"] = {
+                    "success": success,
+                    "encoder": encoder,
+                    "workers": worker_count,
+                    "encode_seconds": round(wall, 3),
+                    "cpu_seconds": round(cpu, 3),
+                    "encode_seconds_per_output_minute": round(wall / output_minutes, 3),
+                    "cpu_seconds_per_output_minute": round(cpu / output_minutes, 3),
+                    "file_bytes": os.path.getsize(output_file) if success else 0
+                }
+
+    return results
+
+
+def benchmark_incremental(num_scenes=15, changed_scenes=(7,), scene_seconds=10, width=1080, height=1920,
+                          encoder="still", workers=None):
+    """
+    Compares a full composition with the re-render of a story where some scenes changed.
+
+    The story is composed once on an empty segment cache, then the narration of
+    the changed scenes is replaced and the story is composed again.
+
+    Args:
+        num_scenes (int): Number of scenes
+        changed_scenes (tuple): Scene numbers whose narration is edited before the re-render
+        scene_seconds (float): Narration length per scene
+        width (int): Video width
+        height (int): Video height
+        encoder (str): Encoder to use
+        workers (int): Encode processes, defaults to the available CPU cores
+
+    Returns:
+        dict: Encode seconds of the full and the incremental render
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        scene_assets = [make_synthetic_scene(work_dir, i, scene_seconds, width, height)
+                        for i in range(1, num_scenes + 1)]
+        generator = ImageBasedVideoGenerator(cache_dir=os.path.join(work_dir, "cache"), encoder=encoder,
+                                             encode_workers=workers)
+        full_success, full_wall, full_cpu = measure(generator.compose_video, scene_assets,
+                                                    os.path.join(work_dir, "full.mp4"))
+
+        for scene_number in changed_scenes:
+            image_file, _ = scene_assets[scene_number - 1]
+            _, audio_file = make_synthetic_scene(work_dir, num_scenes + scene_number, scene_seconds, 16, 16)
+            scene_assets[scene_number - 1] = (image_file, audio_file)
+        success, wall, cpu = measure(generator.compose_video, scene_assets, os.path.join(work_dir, "edited.mp4"))
+
+    return {
+        "num_scenes": num_scenes,
+        "changed_scenes": list(changed_scenes),
+        "encoder": encoder,
+        "full": {"success": full_success, "encode_seconds": round(full_wall, 3), "cpu_seconds": round(full_cpu, 3)},
+        "incremental": {"success": success, "encode_seconds": round(wall, 3), "cpu_seconds": round(cpu, 3)},
+        "speedup": round(full_wall / wall, 2) if wall else None
+    }
+
+
+def benchmark_motion(num_scenes=3, scene_seconds=10, width=1080, height=1920, motions=("zoom_in", "pan_left", "drift"),
+                     workers=None, captions=False):
+    """
+    Measures how much slower a story composes with Ken Burns motion than with still scenes.
+
+    Every run starts with an empty cache, so image preparation and encoding are included.
+
+    Args:
+        num_scenes (int): Number of scenes
+        scene_seconds (float): Narration length per scene
+        width (int): Video width
+        height (int): Video height
+        motions (tuple): Motion presets to compare, each applied to every scene
+        workers (int): Encode processes, defaults to the available CPU cores
+        captions (bool): Burn narration captions into every scene, to compare against a run without them
+
+    Returns:
+        dict: Compose seconds of the still story and of each motion, and each motion's factor over still
+    """
+    specs = {'width': width, 'height': height}
+    results = {
+        "num_scenes": num_scenes,
+        "scene_seconds": scene_seconds,
+        "resolution": f"{width}x{height}",
+        "cpus": available_cpus(),
+        "captions": captions,
+        "runs": {}
+    }
+    # About as many words as the narration of a scene this long
+    narration = " ".join(["the young animal explores its home"] * max(1, round(scene_seconds / 2.5)))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        scene_assets = [make_synthetic_scene(work_dir, i, scene_seconds, 1024, 1792)
+                        for i in range(1, num_scenes + 1)]
+
+        for motion in ("still",) + tuple(motions):
+            generator = ImageBasedVideoGenerator(cache_dir=os.path.join(work_dir, f"cache_{motion}"),
+                                                 encode_workers=workers, burn_captions=captions)
+            scenes = [{"motion": motion} if motion != "still" else {} for _ in scene_assets]
+            if captions:
+                scenes = [dict(scene, narration=narration) for scene in scenes]
+            success, wall, cpu = measure(generator.compose_video, scene_assets,
+                                         os.path.join(work_dir, f"{motion}.mp4"), specs, None, None, scenes)
+            results["runs"][motion] = {
+                "success": success,
+                "seconds": round(wall, 3),
+                "cpu_seconds": round(cpu, 3),
+                "factor": round(wall / results["runs"]["still"]["seconds"], 2) if motion != "still" else 1.0
+            }
+
+    return results
+
+
+def latency_summary(samples, failures=0):
+    """
+    Summarizes per-call latencies.
+
+    Args:
+        samples (list): Seconds per call
+        failures (int): Calls that did not succeed
+
+    Returns:
+        dict: Call count, failures and mean/p50/p95/max seconds
+    """
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "failures": failures,
+        "mean_seconds": round(statistics.mean(ordered), 4) if ordered else None,
+        "p50_seconds": round(ordered[len(ordered) // 2], 4) if ordered else None,
+        "p95_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4) if ordered else None,
+        "max_seconds": round(ordered[-1], 4) if ordered else None
+    }
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process and of its waited-for children in MiB."""
+    # ru_maxrss is reported in KiB on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    }
+
+
+def time_calls(function, calls, release=None):
+    """
+    Runs calls one after another and times each of them.
+
+    Args:
+        function (callable): Returns a truthy value on success
+        calls (list): Argument tuples
+        release (callable): Called with each result once it is timed, to free what it holds
+
+    Returns:
+        dict: Latency summary
+    """
+    samples, failures = [], 0
+    for args in calls:
+        result, wall, _ = measure(function, *args)
+        samples.append(wall)
+        if not result or (isinstance(result, tuple) and not result[0]):
+            failures += 1
+        if release:
+            release(result)
+    return latency_summary(samples, failures)
+
+
+def close_scene_clip(scene):
+    """
+    Closes the clip returned by create_scene and its narration reader.
+
+    Args:
+        scene (tuple): (video_clip, duration) as returned by create_scene
+    """
+    clip = scene[0] if isinstance(scene, tuple) else None
+    if clip is None:
+        return
+    if clip.audio is not None:
+        clip.audio.close()
+    clip.close()
+
+
+def run_pipeline(num_scenes, base_url, work_dir, max_concurrency=4, encode_workers=None, voice="alloy"):
+    """
+    Times every pipeline stage for one story against the stand-in server.
+
+    Meant to run in a fresh process, so the peak memory belongs to this story only.
+
+    Args:
+        num_scenes (int): Scenes in the story
+        base_url (str): OpenAI base URL of the stand-in server
+        work_dir (str): Directory for caches and outputs
+        max_concurrency (int): Concurrent image/TTS requests of the render
+        encode_workers (int): Encode processes of the render
+        voice (str): Voice for TTS
+
+    Returns:
+        dict: Per-stage timings and peak memory
+    """
+    os.environ["OPENAI_BASE_URL"] = base_url
+    api_key = "stub-key"
+    specs = PIPELINE_PLATFORM_SPECS
+    stages = {}
+
+    # Story
+    story, wall, _ = measure(generate_animal_story_with_client, get_openai_client(api_key), "Fox", num_scenes,
+                             use_cache=False)
+    stages["story"] = latency_summary([wall], 0 if story else 1)
+    if not story:
+        return {"num_scenes": num_scenes, "stages": stages, "peak_rss_mb": peak_rss_mb()}
+    scenes = story["scenes"]
+
+    # Single requests, one after another, for per-call latency
+    generator = ImageBasedVideoGenerator(api_key, max_concurrency, cache_dir=os.path.join(work_dir, "cache_calls"),
+                                         encode_workers=encode_workers)
+    image_size = generator.get_image_size(specs)
+    stages["image"] = time_calls(generator.generate_image_with_openai, [
+        (scene["image_prompt"], os.path.join(work_dir, f"image_{i}.png"), image_size)
+        for i, scene in enumerate(scenes, 1)
+    ])
+    stages["tts"] = time_calls(generator.generate_tts_openai, [
+        (scene["narration"], os.path.join(work_dir, f"audio_{i}.wav"), voice)
+        for i, scene in enumerate(scenes, 1)
+    ])
+
+    # create_scene on an empty cache: image, narration and clip per scene
+    generator = ImageBasedVideoGenerator(api_key, max_concurrency, cache_dir=os.path.join(work_dir, "cache_scenes"),
+                                         encode_workers=encode_workers)
+    stages["create_scene"] = time_calls(generator.create_scene, [
+        (scene, i, work_dir, story, voice, specs) for i, scene in enumerate(scenes, 1)
+    ], release=close_scene_clip)
+
+    # Full render on an empty cache: concurrent assets, then the encode
+    generator = ImageBasedVideoGenerator(api_key, max_concurrency, cache_dir=os.path.join(work_dir, "cache_render"),
+                                         encode_workers=encode_workers)
+    assets, wall, _ = measure(generator.generate_scene_assets, scenes, work_dir, voice, specs)
+    scene_assets = [scene_assets for scene_assets in assets if scene_assets]
+    stages["assets"] = {
+        "seconds": round(wall, 3),
+        "scenes": len(scene_assets),
+        "scenes_per_second": round(len(scene_assets) / wall, 3) if wall else None
+    }
+
+    output_file = os.path.join(work_dir, "story.mp4")
+    composed, wall, cpu = measure(generator.compose_video, scene_assets, output_file, specs,
+                                  os.path.join(work_dir, "segments"))
+    stages["encode"] = {"success": bool(composed), "seconds": round(wall, 3), "cpu_seconds": round(cpu, 3)}
+
+    return {"num_scenes": num_scenes, "stages": stages, "peak_rss_mb": peak_rss_mb(), "metrics": metrics.snapshot()}
+
+
+def benchmark_pipeline(scene_counts=(3, 5, 10, 15), latency=None, error_rate=0.0, max_concurrency=4,
+                       encode_workers=None, seed=0, error_status=500):
+    """
+    Runs the whole pipeline offline against a local OpenAI stand-in server.
+
+    Every story size runs in its own process with empty caches.
+
+    Args:
+        scene_counts (tuple): Story sizes to run
+        latency (dict): Seconds per endpoint family (chat, images, download, audio)
+        error_rate (float): Share of API requests the server fails
+        max_concurrency (int): Concurrent image/TTS requests of the render
+        encode_workers (int): Encode processes of the render
+        seed (int): Seed of the error injection
+        error_status (int): HTTP status of injected errors (500, or 429 with Retry-After)
+
+    Returns:
+        dict: Settings and per-story stage results
+    """
+    results = {
+        "settings": {
+            "latency_seconds": dict(DEFAULT_LATENCY, **(latency or {})),
+            "error_rate": error_rate,
+            "error_status": error_status,
+            "max_concurrency": max_concurrency,
+            "encode_workers": encode_workers,
+            "cpus": available_cpus()
+        },
+        "runs": []
+    }
+
+    with OpenAIStubServer(latency=latency, error_rate=error_rate, seed=seed, error_status=error_status) as server:
+        for num_scenes in scene_counts:
+            requests_before = server.stats()
+            with tempfile.TemporaryDirectory() as work_dir:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    run, wall, _ = measure(lambda: executor.submit(
+                        run_pipeline, num_scenes, server.url, work_dir, max_concurrency, encode_workers
+                    ).result())
+
+            requests_after = server.stats()
+            run["total_seconds"] = round(wall, 3)
+            run["server"] = {
+                "requests": {family: count - requests_before["requests"].get(family, 0)
+                             for family, count in requests_after["requests"].items()},
+                "injected_errors": requests_after["injected_errors"] - requests_before["injected_errors"]
+            }
+            results["runs"].append(run)
+
+    return results
+
+
+def compose_peak_rss(num_scenes, scene_seconds, width, height, encoder, workers):
+    """
+    Composes a synthetic story and reports the peak memory of the process.
+
+    Meant to run in a fresh process, so the peak belongs to this story only.
+
+    Returns:
+        dict: Peak RSS of the process and its children in MiB, and whether the video was written
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        scene_assets = [make_synthetic_scene(work_dir, i, scene_seconds, width, height)
+                        for i in range(1, num_scenes + 1)]
+        generator = ImageBasedVideoGenerator(cache_dir=os.path.join(work_dir, "cache"), encoder=encoder,
+                                             encode_workers=workers)
+        success = generator.compose_video(scene_assets, os.path.join(work_dir, "story.mp4"),
+                                          {'width': width, 'height': height}, os.path.join(work_dir, "segments"))
+    return {"success": success, "peak_rss_mb": peak_rss_mb()}
+
+
+def benchmark_memory(scene_counts=(3, 15), scene_seconds=5, width=1080, height=1920, encoders=ENCODERS, workers=1,
+                     max_growth_mb=None):
+    """
+    Measures how peak memory of the composition grows with story length.
+
+    Composition should release each scene before the next, so the peak RSS of a
+    15-scene story should match that of a 3-scene story.
+
+    Args:
+        scene_counts (tuple): Story sizes to compare
+        scene_seconds (float): Narration length per scene
+        width (int): Video width
+        height (int): Video height
+        encoders (tuple): Encoders to measure
+        workers (int): Encode processes
+        max_growth_mb (float): Allowed growth of the peak RSS, of this process and of
+            the encoders, from the smallest to the largest story; None only reports
+
+    Returns:
+        dict: Peak RSS per encoder and story size, the growth from the smallest to the
+            largest story, and whether every growth stayed within max_growth_mb
+    """
+    results = {
+        "scene_seconds": scene_seconds,
+        "resolution": f"{width}x{height}",
+        "workers": workers,
+        "max_growth_mb": max_growth_mb,
+        "within_limit": True,
+        "encoders": {}
+    }
+
+    for encoder in encoders:
+        runs = {}
+        for num_scenes in scene_counts:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                runs[num_scenes] = executor.submit(
+                    compose_peak_rss, num_scenes, scene_seconds, width, height, encoder, workers
+                ).result()
+
+        smallest, largest = runs[min(runs)]["peak_rss_mb"], runs[max(runs)]["peak_rss_mb"]
+        growth = {
+            "self": round(largest["self"] - smallest["self"], 1),
+            "children": round(largest["children"] - smallest["children"], 1)
+        }
+        within_limit = max_growth_mb is None or max(growth.values()) <= max_growth_mb
+        results["encoders"][encoder] = {
+            "runs": {str(num_scenes): run for num_scenes, run in runs.items()},
+            "growth_mb": growth,
+            "within_limit": within_limit
+        }
+        results["within_limit"] = results["within_limit"] and within_limit
+
+    return results
+
+
+STARTUP_MODULES = ("prompt_generator", "video_generator", "app")
+
+# Backends that should only be loaded on first use
+HEAVY_MODULES = ("moviepy.editor", "moviepy", "numpy", "PIL.Image", "openai", "requests", "google.generativeai")
+
+STARTUP_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+error = None
+try:
+    import {module}
+except BaseException as e:
+    error = repr(e)
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "error": error,
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def benchmark_startup(modules=STARTUP_MODULES, runs=5):
+    """
+    Measures the import time of the entry modules in fresh interpreters.
+
+    Args:
+        modules (tuple): Modules to import
+        runs (int): Fresh interpreters per module
+
+    Returns:
+        dict: Median and best import seconds per module, and the heavy backends each import loaded
+    """
+    results = {"runs": runs, "modules": {}}
+    for module in modules:
+        samples, probe = [], {}
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, "-c", STARTUP_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+            lines = completed.stdout.strip().splitlines()
+            probe = json.loads(lines[-1]) if lines else {"error": completed.stderr.strip()[-500:]}
+            if probe.get("error"):
+                break
+            samples.append(probe["seconds"])
+
+        results["modules"][module] = {
+            "median_seconds": round(statistics.median(samples), 4) if samples else None,
+            "best_seconds": round(min(samples), 4) if samples else None,
+            "loaded_backends": probe.get("loaded", []),
+            "error": probe.get("error")
+        }
+    return results
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output", help="Also write the JSON results to this file")
+
+    parser = argparse.ArgumentParser(description="Benchmarks for the animation pipeline")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    encode_parser = subparsers.add_parser("encode", parents=[common], help="Compare still-image and moviepy encoding")
+    encode_parser.add_argument("--scenes", type=int, default=5)
+    encode_parser.add_argument("--scene-seconds", type=float, default=10)
+    encode_parser.add_argument("--width", type=int, default=1080)
+    encode_parser.add_argument("--height", type=int, default=1920)
+    encode_parser.add_argument("--encoders", nargs="+", choices=ENCODERS, default=list(ENCODERS))
+    encode_parser.add_argument("--workers", nargs="+", type=int, help="Encode worker counts to compare")
+
+    incremental_parser = subparsers.add_parser("incremental", parents=[common],
+                                               help="Re-render a story after editing some of its scenes")
+    incremental_parser.add_argument("--scenes", type=int, default=15)
+    incremental_parser.add_argument("--changed", nargs="+", type=int, default=[7], help="Edited scene numbers")
+    incremental_parser.add_argument("--scene-seconds", type=float, default=10)
+    incremental_parser.add_argument("--width", type=int, default=1080)
+    incremental_parser.add_argument("--height", type=int, default=1920)
+    incremental_parser.add_argument("--encoder", choices=ENCODERS, default="still")
+    incremental_parser.add_argument("--workers", type=int, help="Encode processes")
+
+    motion_parser = subparsers.add_parser("motion", parents=[common],
+                                          help="Compare composing with Ken Burns motion against still scenes")
+    motion_parser.add_argument("--scenes", type=int, default=3)
+    motion_parser.add_argument("--scene-seconds", type=float, default=10)
+    motion_parser.add_argument("--width", type=int, default=1080)
+    motion_parser.add_argument("--height", type=int, default=1920)
+    motion_parser.add_argument("--motions", nargs="+", choices=list(MOTION_PRESETS),
+                               default=["zoom_in", "pan_left", "drift"])
+    motion_parser.add_argument("--workers", type=int, help="Encode processes")
+    motion_parser.add_argument("--captions", action="store_true", help="Burn narration captions into the scenes")
+
+    pipeline_parser = subparsers.add_parser("pipeline", parents=[common],
+                                            help="Time every stage offline against a local OpenAI stand-in")
+    pipeline_parser.add_argument("--scenes", nargs="+", type=int, default=[3, 5, 10, 15])
+    for family, seconds in DEFAULT_LATENCY.items():
+        pipeline_parser.add_argument(f"--{family}-latency", type=float, default=seconds,
+                                     help=f"Seconds the stand-in waits on {family} requests")
+    pipeline_parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API requests that fail")
+    pipeline_parser.add_argument("--concurrency", type=int, default=4)
+    pipeline_parser.add_argument("--workers", type=int, help="Encode processes")
+    pipeline_parser.add_argument("--seed", type=int, default=0)
+    pipeline_parser.add_argument("--error-status", type=int, default=500, choices=[429, 500, 503])
+
+    memory_parser = subparsers.add_parser("memory", parents=[common],
+                                          help="Compare peak RSS of short and long stories")
+    memory_parser.add_argument("--scenes", nargs="+", type=int, default=[3, 15])
+    memory_parser.add_argument("--scene-seconds", type=float, default=5)
+    memory_parser.add_argument("--width", type=int, default=1080)
+    memory_parser.add_argument("--height", type=int, default=1920)
+    memory_parser.add_argument("--encoders", nargs="+", choices=ENCODERS, default=list(ENCODERS))
+    memory_parser.add_argument("--workers", type=int, default=1, help="Encode processes")
+    memory_parser.add_argument("--max-growth-mb", type=float,
+                               help="Exit with status 1 if peak RSS grows more than this from the smallest to the largest story")
+
+    startup_parser = subparsers.add_parser("startup", parents=[common],
+                                           help="Import time of the app and pipeline modules")
+    startup_parser.add_argument("--modules", nargs="+", default=list(STARTUP_MODULES))
+    startup_parser.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "encode":
+        results = benchmark_encoders(args.scenes, args.scene_seconds, args.width, args.height,
+                                     tuple(args.encoders), args.workers)
+    elif args.benchmark == "incremental":
+        results = benchmark_incremental(args.scenes, tuple(args.changed), args.scene_seconds, args.width,
+                                        args.height, args.encoder, args.workers)
+    elif args.benchmark == "motion":
+        results = benchmark_motion(args.scenes, args.scene_seconds, args.width, args.height,
+                                   tuple(args.motions), args.workers, args.captions)
+    elif args.benchmark == "pipeline":
+        latency = {family: getattr(args, f"{family}_latency") for family in DEFAULT_LATENCY}
+        results = benchmark_pipeline(tuple(args.scenes), latency, args.error_rate, args.concurrency,
+                                     args.workers, args.seed, args.error_status)
+    elif args.benchmark == "memory":
+        results = benchmark_memory(tuple(args.scenes), args.scene_seconds, args.width, args.height,
+                                   tuple(args.encoders), args.workers, args.max_growth_mb)
+    elif args.benchmark == "startup":
+        results = benchmark_startup(tuple(args.modules), args.runs)
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+
+    if args.benchmark == "memory" and not results["within_limit"]:
+        print(f"Peak RSS grew more than {args.max_growth_mb} MiB with story length", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
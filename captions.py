@@ -0,0 +1,249 @@
+import os
+import math
+
+# TrueType font of burned-in captions; PIL's built-in font is used if it cannot be found
+CAPTION_FONT = os.getenv("CAPTION_FONT", "DejaVuSans-Bold.ttf")
+
+# Lines shown at once
+MAX_LINES = 2
+
+# Caption size and position relative to the frame
+FONT_SCALE = 0.05     # of the shorter side
+MAX_WIDTH = 0.86      # of the width
+BOTTOM_MARGIN = 0.12  # of the height, clear of the platforms' own controls
+
+# Part of every caption overlay cache key; bump it when the look of captions changes
+CAPTION_STYLE = 3
+
+
+def caption_font(width, height):
+    """
+    Loads the caption font at the size used for a frame size.
+
+    Args:
+        width (int): Frame width
+        height (int): Frame height
+
+    Returns:
+        ImageFont.FreeTypeFont: Caption font, or PIL's bitmap font if no TrueType font is available
+    """
+    from PIL import ImageFont
+
+    size = max(12, round(min(width, height) * FONT_SCALE))
+    try:
+        return ImageFont.truetype(CAPTION_FONT, size)
+    except OSError:
+        pass
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only ships a small bitmap font
+        return ImageFont.load_default()
+
+
+def wrap_text(text, font, max_width):
+    """
+    Breaks text into lines no wider than max_width pixels.
+
+    Args:
+        text (str): Text to wrap
+        font (ImageFont.FreeTypeFont): Font the lines are measured with
+        max_width (float): Longest line in pixels
+
+    Returns:
+        list: Lines
+    """
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if line and font.getlength(candidate) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def split_words(words, count):
+    """
+    Splits words into consecutive groups of about the same number of characters.
+
+    Args:
+        words (list): Words in reading order
+        count (int): Groups wanted
+
+    Returns:
+        list: Non-empty word groups
+    """
+    total = sum(len(word) + 1 for word in words)
+    groups = [[] for _ in range(count)]
+    position = 0
+    for word in words:
+        # A word goes to the group its middle falls into
+        middle = position + (len(word) + 1) / 2
+        groups[min(count - 1, int(middle * count / total))].append(word)
+        position += len(word) + 1
+    return [group for group in groups if group]
+
+
+def caption_blocks(text, duration, width, height, frame_rate=None, min_seconds=0.0):
+    """
+    Splits narration into caption blocks of up to MAX_LINES lines, timed across the narration.
+
+    Only a block merged because it was too short to show can hold more lines.
+
+    The words are spread evenly over the fewest blocks that fit, so no block is
+    left with a lone trailing word. Each block is shown for a share of the duration
+    proportional to its length, so the captions follow the voice at its average
+    pace. Block boundaries are snapped to the frame grid of the scene's segment, and
+    blocks shorter than min_seconds (or than one frame) are merged into their
+    shorter neighbour, so the burned-in captions and the subtitle files agree.
+
+    Args:
+        text (str): Narration text
+        duration (float): Narration length in seconds
+        width (int): Frame width
+        height (int): Frame height
+        frame_rate (float): Frame rate of the scene's segment, None leaves boundaries unsnapped
+        min_seconds (float): Shortest time a block is shown
+
+    Returns:
+        list: (start, end, lines) per block, together covering 0 to duration
+    """
+    font = caption_font(width, height)
+    max_width = width * MAX_WIDTH
+    words = text.split()
+    if not words:
+        return []
+
+    count = math.ceil(len(wrap_text(text, font, max_width)) / MAX_LINES)
+    while True:
+        blocks = [wrap_text(" ".join(group), font, max_width) for group in split_words(words, count)]
+        if count >= len(words) or all(len(lines) <= MAX_LINES for lines in blocks):
+            break
+        count += 1
+
+    # Boundaries between blocks, proportional to their length
+    lengths = [len(" ".join(lines)) for lines in blocks]
+    boundaries = []
+    elapsed = 0
+    for length in lengths[:-1]:
+        elapsed += length
+        boundary = duration * elapsed / sum(lengths)
+        if frame_rate:
+            boundary = round(boundary * frame_rate) / frame_rate
+        boundaries.append(min(boundary, duration))
+
+    timed = []
+    for i, lines in enumerate(blocks):
+        start = boundaries[i - 1] if i else 0.0
+        end = boundaries[i] if i < len(boundaries) else duration
+        timed.append((start, end, lines))
+
+    # Merge blocks too short to be read, or to be seen at all, into a neighbour
+    shortest = max(min_seconds, 1 / frame_rate if frame_rate else 0.0)
+    while len(timed) > 1:
+        short = [i for i, (start, end, _) in enumerate(timed) if end - start < shortest - 1e-9]
+        if not short:
+            break
+        i = short[0]
+        if i == 0:
+            neighbour = 1
+        elif i == len(timed) - 1:
+            neighbour = i - 1
+        else:
+            before, after = timed[i - 1], timed[i + 1]
+            neighbour = i - 1 if before[1] - before[0] <= after[1] - after[0] else i + 1
+        first, second = sorted((i, neighbour))
+        merged = (timed[first][0], timed[second][1], timed[first][2] + timed[second][2])
+        timed[first:second + 1] = [merged]
+    return timed
+
+
+def render_caption(lines, width, height, output_file):
+    """
+    Rasterizes a caption block into a transparent full-frame RGBA image.
+
+    Args:
+        lines (list): Caption lines
+        width (int): Frame width
+        height (int): Frame height
+        output_file (str): Output image path (.png)
+
+    Returns:
+        bool: True on success
+    """
+    from PIL import Image, ImageDraw
+
+    font = caption_font(width, height)
+    # Measured instead of read from font.size, which the bitmap fallback font lacks
+    _, text_top, _, text_bottom = font.getbbox("Ag")
+    text_height = text_bottom - text_top
+    line_height = round(text_height * 1.4)
+    padding = round(text_height * 0.55)
+    box_width = max(font.getlength(line) for line in lines) + 2 * padding
+    box_height = line_height * len(lines) + 2 * padding
+    left = (width - box_width) / 2
+    bottom = height * (1 - BOTTOM_MARGIN)
+    top = bottom - box_height
+
+    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    draw.rounded_rectangle([left, top, left + box_width, bottom], radius=padding, fill=(0, 0, 0, 150))
+    for i, line in enumerate(lines):
+        # Centered by hand: bitmap fonts on older Pillow ignore text anchors
+        x = (width - font.getlength(line)) / 2
+        y = top + padding + line_height * (i + 0.5) - (text_top + text_bottom) / 2
+        draw.text((x, y), line, font=font, fill="white", stroke_width=max(1, text_height // 12),
+                  stroke_fill="black")
+    overlay.save(output_file, "PNG")
+    return True
+
+
+def composite_caption(image_file, overlay_file, output_file):
+    """
+    Composites a caption overlay onto a scene image of the same size.
+
+    Args:
+        image_file (str): Scene image path
+        overlay_file (str): RGBA caption overlay from render_caption()
+        output_file (str): Output image path (.png)
+    """
+    from PIL import Image
+
+    with Image.open(image_file) as image, Image.open(overlay_file) as overlay:
+        captioned = Image.alpha_composite(image.convert("RGBA"), overlay.convert("RGBA"))
+    captioned.convert("RGB").save(output_file, "PNG", compress_level=1)
+
+
+def format_timestamp(seconds, separator=","):
+    """Formats seconds as HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm (WebVTT)."""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def write_subtitles(cues, srt_file, vtt_file):
+    """
+    Writes caption cues as SRT and WebVTT sidecar files.
+
+    Args:
+        cues (list): (start, end, lines) per caption block, in seconds from the start of the video
+        srt_file (str): SRT output path
+        vtt_file (str): WebVTT output path
+    """
+    with open(srt_file, 'w', encoding='utf-8') as f:
+        for i, (start, end, lines) in enumerate(cues, 1):
+            f.write(f"{i}\n{format_timestamp(start)} --> {format_timestamp(end)}\n")
+            f.write("\n".join(lines) + "\n\n")
+
+    with open(vtt_file, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for start, end, lines in cues:
+            f.write(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n")
+            f.write("\n".join(lines) + "\n\n")
@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Where events and the Prometheus text files are written; {pid} in the
+# Prometheus file name is replaced by the process id, so every process
+# exports its own totals instead of overwriting another process's file
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join("output", "metrics"))
+EVENTS_FILE = os.path.join(METRICS_DIR, "events.jsonl")
+PROMETHEUS_FILE = os.path.join(METRICS_DIR, "pipeline_{pid}.prom")
+
+# Per-process files of exited processes are kept this long so their last
+# totals still get scraped, then removed
+STALE_EXPORT_SECONDS = 24 * 3600
+
+METRIC_PREFIX = "animation_"
+
+# Upper bounds of the stage duration histogram in seconds
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+COUNTER_HELP = {
+    "stage_failures_total": "Pipeline stage runs that failed",
+    "cache_lookups_total": "Asset cache lookups by result",
+    "retries_total": "API requests retried by the request scheduler",
+    "throttle_seconds_total": "Seconds requests waited for the rate limiter"
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_events_file = EVENTS_FILE
+_prometheus_file = PROMETHEUS_FILE
+
+
+def configure(events_file=None, prometheus_file=None):
+    """
+    Changes where metrics are written.
+
+    Args:
+        events_file (str): JSON lines event log, "" disables it
+        prometheus_file (str): Prometheus text file written by export(), may contain {pid}
+    """
+    global _events_file, _prometheus_file
+    with _lock:
+        if events_file is not None:
+            _events_file = events_file
+        if prometheus_file is not None:
+            _prometheus_file = prometheus_file
+
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name, value=1, **labels):
+    """
+    Adds to a counter.
+
+    Args:
+        name (str): Counter name without prefix, e.g. "cache_lookups_total"
+        value (float): Amount to add
+        **labels: Label values
+    """
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(stage, seconds, **labels):
+    """
+    Records one stage duration in the stage histogram.
+
+    Args:
+        stage (str): Stage name
+        seconds (float): Duration
+        **labels: Extra label values
+    """
+    key = _labels_key(dict(labels, stage=stage))
+    with _lock:
+        histogram = _histograms.setdefault(key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+
+def log_event(event, **fields):
+    """
+    Appends a structured event to the JSON lines log.
+
+    Args:
+        event (str): Event type
+        **fields: Event fields
+    """
+    if not _events_file:
+        return
+    record = dict(fields, event=event, time=time.time(), pid=os.getpid())
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _lock:
+        try:
+            os.makedirs(os.path.dirname(_events_file) or ".", exist_ok=True)
+            with open(_events_file, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Metrics log error: {str(e)}")
+
+
+@contextmanager
+def timer(stage, **labels):
+    """
+    Times a pipeline stage.
+
+    The span is recorded in the stage histogram and the event log. Setting
+    span["status"] = "error" inside the block, or raising, counts the run as a
+    failure; other keys set on the span are logged with it.
+
+    Args:
+        stage (str): Stage name, e.g. "tts"
+        **labels: Label values for the histogram
+
+    Yields:
+        dict: Span fields
+    """
+    span = {"status": "ok"}
+    start = time.perf_counter()
+    try:
+        yield span
+    except GeneratorExit:
+        # A consumer stopped iterating early; that is not a failure
+        span.setdefault("cancelled", True)
+        raise
+    except BaseException:
+        span["status"] = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        observe(stage, seconds, **labels)
+        if span["status"] != "ok":
+            increment("stage_failures_total", stage=stage, **labels)
+        log_event("span", stage=stage, seconds=round(seconds, 4), **labels, **span)
+
+
+def snapshot():
+    """
+    Returns the current counters and stage totals.
+
+    Returns:
+        dict: {"counters": [...], "stages": [...]}
+    """
+    with _lock:
+        return {
+            "counters": [dict(labels, name=name, value=value) for (name, labels), value in _counters.items()],
+            "stages": [dict(labels, count=histogram["count"], seconds=round(histogram["sum"], 4))
+                       for labels, histogram in _histograms.items()]
+        }
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def prometheus_text(process_label=False):
+    """
+    Renders all metrics in the Prometheus text exposition format.
+
+    Args:
+        process_label (bool): Add a process="<pid>" label to every series, so
+            the files of several processes can be collected side by side
+
+    Returns:
+        str: Exposition text
+    """
+    extra = (("process", str(os.getpid())),) if process_label else ()
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {labels: dict(histogram, buckets=list(histogram["buckets"]))
+                      for labels, histogram in _histograms.items()}
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {COUNTER_HELP.get(name, name)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(extra + labels)} {value}")
+
+    if histograms:
+        name = f"{METRIC_PREFIX}stage_seconds"
+        lines.append(f"# HELP {name} Time spent per pipeline stage")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(histograms.items()):
+            labels = extra + labels
+            for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_stale_exports(pattern):
+    """Deletes per-process files of exited processes that were not written for STALE_EXPORT_SECONDS."""
+    directory = os.path.dirname(pattern) or "."
+    prefix, suffix = os.path.basename(pattern).split("{pid}", 1)
+    name_pattern = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + "$")
+    cutoff = time.time() - STALE_EXPORT_SECONDS
+    for name in os.listdir(directory):
+        match = name_pattern.match(name)
+        if not match or _process_alive(int(match.group(1))):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def export(prometheus_file=None):
+    """
+    Writes the Prometheus text file atomically, for node_exporter's textfile collector.
+
+    With {pid} in the path every process writes its own file, labelled with
+    its process id, and old files of processes that have exited are removed.
+
+    Args:
+        prometheus_file (str): Output path, defaults to the configured file
+
+    Returns:
+        str: Written path, or None if it could not be written
+    """
+    pattern = prometheus_file or _prometheus_file
+    per_process = "{pid}" in pattern
+    prometheus_file = pattern.replace("{pid}", str(os.getpid()))
+    try:
+        os.makedirs(os.path.dirname(prometheus_file) or ".", exist_ok=True)
+        tmp_file = f"{prometheus_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(prometheus_text(process_label=per_process))
+        os.replace(tmp_file, prometheus_file)
+        if per_process:
+            _remove_stale_exports(pattern)
+        return prometheus_file
+    except OSError as e:
+        print(f"Metrics export error: {str(e)}")
+        return None
+
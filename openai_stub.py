@@ -0,0 +1,241 @@
+import io
+import re
+import json
+import math
+import time
+import base64
+import random
+import struct
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image
+
+# Seconds each endpoint family waits before answering
+DEFAULT_LATENCY = {"chat": 1.0, "images": 2.0, "download": 0.1, "audio": 0.5}
+
+# Narration speed of the canned audio
+WORDS_PER_SECOND = 2.5
+SAMPLE_RATE = 24000
+
+
+def synthetic_png(width, height):
+    """
+    Renders a deterministic stand-in scene image.
+
+    Args:
+        width (int): Image width
+        height (int): Image height
+
+    Returns:
+        bytes: PNG data
+    """
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    buffer = io.BytesIO()
+    Image.merge("RGB", (gradient, noise, gradient.rotate(90))).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def synthetic_wav(seconds):
+    """
+    Renders a mono 16-bit tone as a WAV file.
+
+    Args:
+        seconds (float): Length of the tone
+
+    Returns:
+        bytes: WAV data
+    """
+    period = [int(8000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) for i in range(SAMPLE_RATE // 220)]
+    samples = int(seconds * SAMPLE_RATE)
+    pcm = struct.pack(f'<{len(period)}h', *period) * (samples // len(period) + 1)
+    pcm = pcm[:samples * 2]
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(pcm), b'WAVE', b'fmt ', 16, 1, 1,
+        SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16, b'data', len(pcm)
+    )
+    return header + pcm
+
+
+def canned_story(num_scenes):
+    """Returns a story in the format the story prompt asks for."""
+    scenes = [{
+        "scene_number": i,
+        "narration": f"In scene {i}, the young animal explores its home, "
+                     f"watches its family and learns something new about the world around it.",
+        "image_prompt": f"Scene {i}: a young animal exploring a sunny meadow, soft light, storybook style",
+        "duration": 8,
+        "background_music": "nature_sounds_gentle"
+    } for i in range(1, num_scenes + 1)]
+    return {"scenes": scenes, "story_title": "A Day in the Meadow", "total_duration": 8 * num_scenes}
+
+
+class OpenAIStubServer:
+    """Local stand-in for the OpenAI chat, image and speech endpoints used by the pipeline"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=None, error_rate=0.0, seed=None, error_status=500,
+                 retry_after=1.0):
+        """
+        Configure the stand-in server. It starts serving on start().
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind, 0 picks a free one
+            latency (dict): Seconds per endpoint family (chat, images, download, audio)
+            error_rate (float): Share of API requests answered with an error
+            seed (int): Seed of the error injection
+            error_status (int): HTTP status of injected errors, e.g. 500 or 429
+            retry_after (float): Retry-After seconds sent with injected 429 responses
+        """
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests = {}
+        self.injected_errors = 0
+        self._lock = threading.Lock()
+        self._images = {}
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                stub.handle(self)
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base URL to use as the OpenAI client's base_url."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """Returns request counts per endpoint family and the number of injected errors."""
+        with self._lock:
+            return {"requests": dict(self.requests), "injected_errors": self.injected_errors}
+
+    def image_png(self, size):
+        """Returns the canned PNG for a WxH size, rendering it once."""
+        with self._lock:
+            if size not in self._images:
+                width, height = (int(value) for value in size.split("x"))
+                self._images[size] = synthetic_png(width, height)
+            return self._images[size]
+
+    def handle(self, request):
+        """Dispatches one HTTP request to the endpoint it imitates."""
+        path = request.path.split("?")[0]
+        length = int(request.headers.get("Content-Length") or 0)
+        body = json.loads(request.rfile.read(length) or b"{}") if length else {}
+
+        if path.endswith("/chat/completions"):
+            family = "chat"
+        elif path.endswith("/images/generations"):
+            family = "images"
+        elif path.endswith("/audio/speech"):
+            family = "audio"
+        elif path.startswith("/v1/files/"):
+            family = "download"
+        else:
+            self.send(request, 404, {"error": {"message": "Unknown endpoint", "type": "invalid_request_error"}})
+            return
+
+        with self._lock:
+            self.requests[family] = self.requests.get(family, 0) + 1
+            fail = family != "download" and self.random.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+
+        time.sleep(self.latency.get(family, 0))
+        if fail:
+            headers = {"Retry-After": str(self.retry_after)} if self.error_status == 429 else {}
+            error_type = "rate_limit_exceeded" if self.error_status == 429 else "server_error"
+            self.send(request, self.error_status, {"error": {"message": "Injected stand-in error", "type": error_type}},
+                      headers)
+            return
+
+        getattr(self, f"handle_{family}")(request, body)
+
+    def handle_chat(self, request, body):
+        match = re.search(r"with (\d+) scenes", body["messages"][-1]["content"])
+        content = json.dumps(canned_story(int(match.group(1)) if match else 5), indent=2)
+        created = int(time.time())
+
+        if not body.get("stream"):
+            self.send(request, 200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": created, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+            return
+
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.end_headers()
+        for start in range(0, len(content), 64):
+            chunk = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 64]}, "finish_reason": None}]
+            }
+            request.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        request.wfile.write(b"data: [DONE]\n\n")
+
+    def handle_images(self, request, body):
+        size = body.get("size", "1024x1024")
+        if body.get("response_format") == "b64_json":
+            item = {"b64_json": base64.b64encode(self.image_png(size)).decode('ascii')}
+        else:
+            host, port = self.server.server_address[:2]
+            item = {"url": f"http://{host}:{port}/v1/files/{size}.png"}
+        self.send(request, 200, {"created": int(time.time()), "data": [item]})
+
+    def handle_download(self, request, body):
+        size = request.path.rsplit("/", 1)[-1].split(".")[0]
+        self.send_bytes(request, self.image_png(size), "image/png")
+
+    def handle_audio(self, request, body):
+        seconds = max(1.0, len(body.get("input", "").split()) / WORDS_PER_SECOND)
+        self.send_bytes(request, synthetic_wav(seconds), "audio/wav")
+
+    def send(self, request, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def send_bytes(self, request, data, content_type):
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import struct
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join("output", "catalog.db")
+
+# Posters and preview proxies live in this folder next to their video
+PREVIEW_DIR = "previews"
+
+# Working directories under output/ that never hold finished videos
+SKIP_DIRS = {"cache", "segments", "manifests", PREVIEW_DIR}
+
+
+def preview_paths(video_file):
+    """
+    Returns where the poster and preview proxy of a video are stored.
+
+    Args:
+        video_file (str): Full-resolution video path
+
+    Returns:
+        tuple: (poster JPEG path, preview MP4 path)
+    """
+    stem = os.path.splitext(os.path.basename(video_file))[0]
+    preview_dir = os.path.join(os.path.dirname(video_file), PREVIEW_DIR)
+    return os.path.join(preview_dir, f"{stem}.jpg"), os.path.join(preview_dir, f"{stem}.mp4")
+
+
+def caption_paths(video_file):
+    """
+    Returns where the SRT and WebVTT caption sidecars of a video are stored.
+
+    Args:
+        video_file (str): Video path
+
+    Returns:
+        tuple: (SRT path, WebVTT path)
+    """
+    stem = os.path.splitext(video_file)[0]
+    return f"{stem}.srt", f"{stem}.vtt"
+
+
+def mp4_duration(video_file):
+    """
+    Reads the duration of an MP4 file from its movie header box.
+
+    Only box headers are read, so this costs a few small reads even for large
+    files, whether the moov box is at the start or the end.
+
+    Args:
+        video_file (str): MP4 file path
+
+    Returns:
+        float: Duration in seconds, or None if the header cannot be found
+    """
+    try:
+        with open(video_file, 'rb') as f:
+            end = os.fstat(f.fileno()).st_size
+            position = 0
+            while position + 8 <= end:
+                f.seek(position)
+                size, box_type = struct.unpack('>I4s', f.read(8))
+                header_size = 8
+                if size == 1:
+                    size = struct.unpack('>Q', f.read(8))[0]
+                    header_size = 16
+                elif size == 0:
+                    size = end - position
+
+                if box_type == b'moov':
+                    # Descend into moov and look for mvhd
+                    position += header_size
+                    end = position - header_size + size
+                    continue
+                if box_type == b'mvhd':
+                    version = f.read(1)[0]
+                    f.read(3)
+                    if version == 1:
+                        f.read(16)
+                        timescale, duration = struct.unpack('>IQ', f.read(12))
+                    else:
+                        f.read(8)
+                        timescale, duration = struct.unpack('>II', f.read(8))
+                    return duration / timescale if timescale else None
+
+                if size < header_size:
+                    return None
+                position += size
+    except (OSError, struct.error, IndexError):
+        pass
+    return None
+
+
+def read_story_info(story_file):
+    """
+    Extracts catalog fields from a story JSON file.
+
+    Args:
+        story_file (str): Story JSON file path
+
+    Returns:
+        tuple: (title, scene count, duration in seconds)
+    """
+    with open(story_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    scenes = data.get('scenes', [])
+    duration = data.get('total_duration')
+    if duration is None:
+        duration = sum(scene.get('duration', 0) for scene in scenes)
+    return data.get('story_title'), len(scenes), duration
+
+
+class OutputCatalog:
+    """SQLite index of story and video files under the output folder"""
+
+    def __init__(self, root="output", db_path=DEFAULT_DB_PATH):
+        """
+        Open (and create if needed) the catalog database.
+
+        Args:
+            root (str): Output folder to index
+            db_path (str): SQLite database path
+        """
+        self.root = root
+        self.db_path = db_path
+        self.last_refresh = 0
+        self._refresh_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    title TEXT,
+                    scene_count INTEGER,
+                    duration REAL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS files_kind_mtime ON files (kind, mtime_ns)")
+
+    def _connect(self):
+        """Open a connection in autocommit mode."""
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _scan(self):
+        """
+        Lists the indexable files under the root.
+
+        Story files are the JSON files directly in the root; videos are MP4 files
+        anywhere below it outside the working directories.
+
+        Returns:
+            dict: path -> (kind, stat result)
+        """
+        found = {}
+        if not os.path.isdir(self.root):
+            return found
+
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith('.json'):
+                found[entry.path] = ("story", entry.stat())
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for filename in filenames:
+                if filename.endswith('.mp4'):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        found[path] = ("video", os.stat(path))
+                    except OSError:
+                        pass
+        return found
+
+    def refresh(self, min_interval=0):
+        """
+        Brings the index up to date with the files on disk.
+
+        Only new or changed files (by size and mtime) are parsed; rows of deleted
+        files are dropped.
+
+        Args:
+            min_interval (float): Skip the scan if the last one is more recent than this many seconds
+
+        Returns:
+            int: Number of files added, updated or removed
+        """
+        with self._refresh_lock:
+            if time.monotonic() - self.last_refresh < min_interval:
+                return 0
+
+            found = self._scan()
+            changes = 0
+            with self._connect() as db:
+                known = {row["path"]: (row["size"], row["mtime_ns"])
+                         for row in db.execute("SELECT path, size, mtime_ns FROM files")}
+
+                for path in known.keys() - found.keys():
+                    db.execute("DELETE FROM files WHERE path = ?", (path,))
+                    changes += 1
+
+                for path, (kind, stat) in found.items():
+                    if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+                        self._index(db, path, kind, stat)
+                        changes += 1
+
+            self.last_refresh = time.monotonic()
+            return changes
+
+    def _index(self, db, path, kind, stat):
+        """Parses one file and stores its row."""
+        title = scene_count = duration = None
+        try:
+            if kind == "story":
+                title, scene_count, duration = read_story_info(path)
+            else:
+                duration = mp4_duration(path)
+        except Exception as e:
+            print(f"Could not index {path}: {str(e)}")
+
+        db.execute(
+            "INSERT OR REPLACE INTO files (path, kind, name, title, scene_count, duration, size, mtime_ns) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, kind, os.path.basename(path), title, scene_count, duration, stat.st_size, stat.st_mtime_ns)
+        )
+
+    def add(self, path):
+        """
+        Indexes a single file right after it was written.
+
+        Args:
+            path (str): Story JSON or MP4 file path
+        """
+        kind = "video" if path.endswith('.mp4') else "story"
+        with self._connect() as db:
+            self._index(db, path, kind, os.stat(path))
+
+    def remove(self, path):
+        """
+        Deletes a file, its poster, preview and caption files, and its index row.
+
+        Args:
+            path (str): Indexed file path
+        """
+        files = [path]
+        if path.endswith('.mp4'):
+            files += preview_paths(path) + caption_paths(path)
+        for file in files:
+            if os.path.exists(file):
+                os.remove(file)
+        with self._connect() as db:
+            db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def count(self, kind):
+        """Returns the number of indexed files of a kind ("story" or "video")."""
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM files WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def list_files(self, kind, page=0, page_size=20):
+        """
+        Lists indexed files of a kind, newest first.
+
+        Args:
+            kind (str): "story" or "video"
+            page (int): Zero-based page number
+            page_size (int): Rows per page, None for all
+
+        Returns:
+            list: File rows as dictionaries
+        """
+        with self._connect() as db:
+            if page_size is None:
+                rows = db.execute(
+                    "SELECT * FROM files WHERE kind = ? ORDER BY mtime_ns DESC", (kind,)
+                ).fetchall()
+            else:
+                rows = db.execute(
+                    "SELECT * FROM files WHERE kind = ? ORDER BY mtime_ns DESC LIMIT ? OFFSET ?",
+                    (kind, page_size, page * page_size)
+                ).fetchall()
+        return [dict(row) for row in rows]
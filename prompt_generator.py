@@ -1,86 +1,97 @@
 import os
+import re
 import json
-from openai import OpenAI
+import time
+import threading
 from dotenv import load_dotenv
 from datetime import datetime
+import metrics
+from api_clients import get_openai_client
+from asset_cache import AssetCache
+from request_scheduler import get_request_scheduler
 
 # Load API key from .env file
 load_dotenv()
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
-# Configure OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Story generation settings
+STORY_MODEL = "gpt-3.5-turbo"
+STORY_TEMPERATURE = 0.7
 
-def generate_animal_story_with_client(client, animal_name, num_scenes=5):
+# Persistent story response cache (TTL in seconds, None keeps stories until evicted)
+STORY_CACHE_DIR = os.path.join("output", "cache", "stories")
+STORY_CACHE_MAX_BYTES = 64 * 1024 ** 2
+STORY_CACHE_TTL = None
+
+_story_cache = None
+_story_cache_lock = threading.Lock()
+
+def get_story_cache():
+    """Returns the shared story response cache."""
+    global _story_cache
+    with _story_cache_lock:
+        if _story_cache is None:
+            _story_cache = AssetCache(STORY_CACHE_DIR, STORY_CACHE_MAX_BYTES)
+        return _story_cache
+
+def get_story_cache_stats():
+    """Returns hit/miss statistics of the story response cache."""
+    return get_story_cache().stats()
+
+def story_cache_key(messages, num_scenes, model=STORY_MODEL, temperature=STORY_TEMPERATURE):
     """
-    Creates an animal's life story scene by scene using provided OpenAI client.
+    Builds the cache key of a story request.
     
     Args:
-        client: OpenAI client instance
-        animal_name (str): Name of the animal
-        num_scenes (int): Number of scenes to create
+        messages (list): Chat messages with the system and user prompt
+        num_scenes (int): Number of scenes
+        model (str): Chat model
+        temperature (float): Sampling temperature
     
     Returns:
-        dict: List of created scenes
+        str: Cache key
     """
-    # Create prompt request
-    system_prompt = """
-    You are a children's nature story writer who generates scene-by-scene English narration and image prompts about an animal's life.
-    Each scene should be educational, engaging, and suitable for children.
-    Focus on the animal's natural behaviors, habitat, and life cycle.
+    return AssetCache.make_key(model, messages[0]["content"], messages[1]["content"], temperature, num_scenes)
+
+def read_cached_story(path, ttl=STORY_CACHE_TTL):
     """
+    Loads a cached story, ignoring it once it is older than ttl.
     
-    user_prompt = f"""
-    Create a story about a {animal_name}'s life with {num_scenes} scenes.
+    Args:
+        path (str): Cached story file
+        ttl (float): Maximum age in seconds, None for no limit
     
-    Provide the response in the following JSON format:
-    {{
-        "scenes": [
-            {{
-                "scene_number": 1,
-                "narration": "English narration text for this scene",
-                "image_prompt": "Detailed image generation prompt for this scene",
-                "duration": 5,
-                "background_music": "nature_sounds_gentle"
-            }}
-        ],
-        "story_title": "Title of the story",
-        "total_duration": 25
-    }}
+    Returns:
+        dict: Story data, or None if missing or expired
     """
-    
+    if not path:
+        return None
     try:
-        # Send request to OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4096
-        )
-        
-        # Parse JSON response
-        result = json.loads(response.choices[0].message.content)
-        return result
-    
-    except Exception as e:
-        print(f"Error occurred: {str(e)}")
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ttl is not None and time.time() - entry.get("created_at", 0) > ttl:
         return None
+    return entry.get("story")
 
-def generate_animal_story(animal_name, num_scenes=5):
+def write_cached_story(path, story_data):
+    """Writes a story cache entry with its creation time."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"created_at": time.time(), "story": story_data}, f, ensure_ascii=False)
+    return True
+
+def build_story_messages(animal_name, num_scenes=5):
     """
-    Creates an animal's life story scene by scene.
+    Builds the chat messages that request an animal story.
     
     Args:
         animal_name (str): Name of the animal
         num_scenes (int): Number of scenes to create
     
     Returns:
-        dict: List of created scenes
+        list: Chat messages
     """
-    # Create prompt request
     system_prompt = """
     You are a children's nature story writer who generates scene-by-scene English narration and image prompts about an animal's life.
     Each scene should be educational, engaging, and suitable for children.
@@ -106,26 +117,258 @@ def generate_animal_story(animal_name, num_scenes=5):
     }}
     """
     
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def parse_story_json(content):
+    """
+    Parses the story JSON from a completion, tolerating text or code fences around it.
+    
+    Args:
+        content (str): Completion text
+    
+    Returns:
+        dict: Story data
+    """
     try:
-        # Send request to OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
+        return json.loads(content)
+    except json.JSONDecodeError:
+        start, end = content.find('{'), content.rfind('}')
+        if start == -1 or end <= start:
+            raise
+        return json.loads(content[start:end + 1])
+
+class SceneStreamParser:
+    """Incrementally extracts complete scene objects from a streamed story JSON"""
+    
+    def __init__(self):
+        self.buffer = ""
+        self.position = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+        self.finished = False
+    
+    def feed(self, text):
+        """
+        Adds streamed text and returns the scenes completed by it.
+        
+        Args:
+            text (str): Next piece of the completion
+        
+        Returns:
+            list: Newly completed scene dictionaries
+        """
+        self.buffer += text
+        scenes = []
+        
+        # Wait until the scenes array has started
+        if self.position is None:
+            match = re.search(r'"scenes"\s*:\s*\[', self.buffer)
+            if not match:
+                return scenes
+            self.position = match.end()
+        
+        while self.position < len(self.buffer) and not self.finished:
+            char = self.buffer[self.position]
+            
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                if self.depth == 0:
+                    self.object_start = self.position
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        scenes.append(json.loads(self.buffer[self.object_start:self.position + 1]))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed scene: {str(e)}")
+            elif char == ']' and self.depth == 0:
+                self.finished = True
+            
+            self.position += 1
+        
+        return scenes
+
+class StoryStream:
+    """Streams a story from the chat API and yields each scene as soon as it is complete"""
+    
+    def __init__(self, client, animal_name, num_scenes=5, model=STORY_MODEL, temperature=STORY_TEMPERATURE,
+                 use_cache=True, force_refresh=False, ttl=STORY_CACHE_TTL):
+        """
+        Prepare a streamed story request. The request starts when iteration begins.
+        
+        Args:
+            client: OpenAI client instance
+            animal_name (str): Name of the animal
+            num_scenes (int): Number of scenes to create
+            model (str): Chat model
+            temperature (float): Sampling temperature
+            use_cache (bool): Serve and store the story through the story cache
+            force_refresh (bool): Always request a fresh story
+            ttl (float): Maximum age of a cached story in seconds, None for no limit
+        """
+        self.client = client
+        self.animal_name = animal_name
+        self.num_scenes = num_scenes
+        self.model = model
+        self.temperature = temperature
+        self.use_cache = use_cache
+        self.force_refresh = force_refresh
+        self.ttl = ttl
+        self.story = None
+    
+    def __iter__(self):
+        """
+        Yields scene dictionaries in story order.
+        
+        Once iteration ends, the complete story is available as self.story
+        (None if the completion could not be parsed).
+        """
+        messages = build_story_messages(self.animal_name, self.num_scenes)
+        key = story_cache_key(messages, self.num_scenes, self.model, self.temperature)
+        
+        # Serve a cached story without streaming
+        if self.use_cache and not self.force_refresh:
+            cache = get_story_cache()
+            cached_story = read_cached_story(cache.get(key, ".json"), self.ttl)
+            cache.record_lookup(cached_story is not None)
+            if cached_story:
+                self.story = cached_story
+                yield from cached_story.get("scenes", [])
+                return
+        
+        parser = SceneStreamParser()
+        with metrics.timer("story", model=self.model, streamed=True) as span:
+            start = time.perf_counter()
+            stream = get_request_scheduler().call(
+                "chat", self.client.api_key, self.client.chat.completions.create,
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=4096,
+                stream=True
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    for scene in parser.feed(text):
+                        span.setdefault("first_scene_seconds", round(time.perf_counter() - start, 4))
+                        yield scene
+            
+            try:
+                self.story = parse_story_json(parser.buffer)
+            except Exception as e:
+                span["status"] = "error"
+                print(f"Error occurred: {str(e)}")
+                self.story = None
+                return
+        
+        if self.use_cache:
+            cache = get_story_cache()
+            tmp_file = f"{cache.path_for(key, '.json')}.{os.getpid()}.{threading.get_ident()}.tmp"
+            write_cached_story(tmp_file, self.story)
+            cache.put(key, ".json", tmp_file)
+
+def request_animal_story(client, messages, model=STORY_MODEL, temperature=STORY_TEMPERATURE):
+    """
+    Sends a story request to the chat API.
+    
+    Args:
+        client: OpenAI client instance
+        messages (list): Chat messages
+        model (str): Chat model
+        temperature (float): Sampling temperature
+    
+    Returns:
+        dict: Parsed story data
+    """
+    with metrics.timer("story", model=model, streamed=False):
+        response = get_request_scheduler().call(
+            "chat", client.api_key, client.chat.completions.create,
+            model=model,
+            messages=messages,
+            temperature=temperature,
             max_tokens=4096
         )
+        return json.loads(response.choices[0].message.content)
+
+def generate_animal_story_with_client(client, animal_name, num_scenes=5, use_cache=True, force_refresh=False,
+                                      ttl=STORY_CACHE_TTL):
+    """
+    Creates an animal's life story scene by scene using provided OpenAI client.
+    
+    Responses are memoized by (model, system prompt, user prompt, temperature,
+    num_scenes), so repeated requests are answered from the story cache.
+    
+    Args:
+        client: OpenAI client instance
+        animal_name (str): Name of the animal
+        num_scenes (int): Number of scenes to create
+        use_cache (bool): Serve and store the story through the story cache
+        force_refresh (bool): Always request a fresh story and replace the cached one
+        ttl (float): Maximum age of a cached story in seconds, None for no limit
+    
+    Returns:
+        dict: List of created scenes
+    """
+    messages = build_story_messages(animal_name, num_scenes)
+    
+    try:
+        if not use_cache:
+            return request_animal_story(client, messages)
+        
+        cache = get_story_cache()
+        key = story_cache_key(messages, num_scenes)
         
-        # Parse JSON response
-        result = json.loads(response.choices[0].message.content)
-        return result
+        # Expired entries are regenerated like forced refreshes
+        refresh = force_refresh or (
+            ttl is not None and cache.get(key, ".json") is not None and
+            read_cached_story(cache.path_for(key, ".json"), ttl) is None
+        )
+        path = cache.get_or_create(
+            key, ".json",
+            lambda tmp_file: write_cached_story(tmp_file, request_animal_story(client, messages)),
+            refresh=refresh
+        )
+        return read_cached_story(path)
     
     except Exception as e:
         print(f"Error occurred: {str(e)}")
         return None
 
+def generate_animal_story(animal_name, num_scenes=5, use_cache=True, force_refresh=False, ttl=STORY_CACHE_TTL):
+    """
+    Creates an animal's life story scene by scene.
+    
+    Args:
+        animal_name (str): Name of the animal
+        num_scenes (int): Number of scenes to create
+        use_cache (bool): Serve and store the story through the story cache
+        force_refresh (bool): Always request a fresh story
+        ttl (float): Maximum age of a cached story in seconds, None for no limit
+    
+    Returns:
+        dict: List of created scenes
+    """
+    client = get_openai_client(OPENAI_API_KEY)
+    return generate_animal_story_with_client(client, animal_name, num_scenes, use_cache, force_refresh, ttl)
+
 def save_story_to_json(story_data, output_file):
     """
     Saves story data to JSON file.
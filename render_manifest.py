@@ -0,0 +1,248 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+
+def file_sha256(path):
+    """
+    Computes the SHA-256 digest of a file.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_fingerprint(story_data, settings):
+    """
+    Identifies a render by everything that affects its output.
+
+    Args:
+        story_data (dict): Story data
+        settings (dict): Voice, platform specs, models and encoder settings
+
+    Returns:
+        str: 16 hex digit fingerprint
+    """
+    payload = json.dumps({"story": story_data, "settings": settings}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class RenderManifest:
+    """Per-render checkpoint recording the asset paths, hashes and status of each scene"""
+
+    def __init__(self, path, settings=None):
+        """
+        Load a manifest from disk, or start a new one.
+
+        Args:
+            path (str): Manifest JSON path
+            settings (dict): Render settings stored with a new manifest
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = {
+                "settings": settings or {},
+                "created_at": datetime.now().isoformat(),
+                "scenes": {},
+                "output_file": None,
+                "status": "pending"
+            }
+
+    @classmethod
+    def for_render(cls, output_dir, story_data, settings):
+        """
+        Open the manifest of a story rendered with the given settings.
+
+        The manifest name is derived from the story content and the settings, so
+        re-running the same render finds its previous checkpoint.
+
+        Args:
+            output_dir (str): Output directory
+            story_data (dict): Story data
+            settings (dict): Everything else that affects the rendered assets
+
+        Returns:
+            RenderManifest: Loaded or new manifest
+        """
+        path = os.path.join(output_dir, "manifests", f"{render_fingerprint(story_data, settings)}.json")
+        return cls(path, settings)
+
+    @property
+    def render_id(self):
+        """Identifier of the render this manifest belongs to."""
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def scene(self, scene_number):
+        """Return the recorded entry of a scene, or None."""
+        return self.data["scenes"].get(str(scene_number))
+
+    def is_done(self, scene_number):
+        """
+        Check that a scene finished and its assets are still intact on disk.
+
+        Args:
+            scene_number (int): Scene number
+
+        Returns:
+            bool: True if the scene can be reused without regenerating it
+        """
+        entry = self.scene(scene_number)
+        if not entry or entry.get("status") != "done":
+            return False
+
+        for kind in ("image", "audio"):
+            path = entry.get(f"{kind}_file")
+            if not path or not os.path.exists(path):
+                return False
+            if file_sha256(path) != entry.get(f"{kind}_sha256"):
+                return False
+        return True
+
+    def failed_scenes(self):
+        """Return the numbers of scenes whose last attempt failed."""
+        return sorted(int(number) for number, entry in self.data["scenes"].items()
+                      if entry.get("status") == "failed")
+
+    def mark_done(self, scene_number, image_file, audio_file):
+        """Record a finished scene with its asset paths and content hashes."""
+        entry = {
+            "status": "done",
+            "image_file": image_file,
+            "image_sha256": file_sha256(image_file),
+            "audio_file": audio_file,
+            "audio_sha256": file_sha256(audio_file),
+            "updated_at": datetime.now().isoformat()
+        }
+        with self._lock:
+            self.data["scenes"][str(scene_number)] = entry
+            self.save()
+
+    def mark_failed(self, scene_number, error="Asset generation failed"):
+        """Record a failed scene so it can be retried later."""
+        entry = {
+            "status": "failed",
+            "error": error,
+            "updated_at": datetime.now().isoformat()
+        }
+        with self._lock:
+            self.data["scenes"][str(scene_number)] = entry
+            self.save()
+
+    def mark_complete(self, output_file, missing_scenes=()):
+        """
+        Record the composed video of this render.
+
+        Args:
+            output_file (str): Video path
+            missing_scenes (list): Numbers of scenes with assets that were still left out of the video
+        """
+        with self._lock:
+            missing = sorted(set(self.failed_scenes()) | set(missing_scenes))
+            self.data["output_file"] = output_file
+            self.data["missing_scenes"] = missing
+            self.data["status"] = "complete" if not missing else "partial"
+            self.save()
+
+    def reset(self):
+        """Forget all recorded scenes so the next render starts from scratch."""
+        with self._lock:
+            self.data["scenes"] = {}
+            self.data["output_file"] = None
+            self.data["status"] = "pending"
+
+    def save(self):
+        """Write the manifest atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class RenderIndex:
+    """SQLite index of finished renders by fingerprint, shared by every output directory and process"""
+
+    def __init__(self, db_path):
+        """
+        Open (and create if needed) the index database.
+
+        Args:
+            db_path (str): SQLite database path
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS renders (
+                    fingerprint TEXT PRIMARY KEY,
+                    output_file TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    settings TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        """Open a connection in autocommit mode."""
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def lookup(self, fingerprint):
+        """
+        Find the video of an earlier identical render.
+
+        Entries whose video was deleted or changed since are dropped.
+
+        Args:
+            fingerprint (str): Render fingerprint
+
+        Returns:
+            str: Video path, or None if there is no usable earlier render
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM renders WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if not row:
+                return None
+            try:
+                if os.path.getsize(row["output_file"]) == row["size"]:
+                    return row["output_file"]
+            except OSError:
+                pass
+            db.execute("DELETE FROM renders WHERE fingerprint = ?", (fingerprint,))
+        return None
+
+    def record(self, fingerprint, output_file, settings=None):
+        """
+        Remember the video of a finished render.
+
+        Args:
+            fingerprint (str): Render fingerprint
+            output_file (str): Rendered video path
+            settings (dict): Render settings, stored for reference
+        """
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO renders (fingerprint, output_file, size, settings, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, output_file, os.path.getsize(output_file), json.dumps(settings),
+                 datetime.now().isoformat())
+            )
@@ -0,0 +1,490 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import traceback
+import subprocess
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load API key from .env file
+load_dotenv()
+
+DEFAULT_DB_PATH = os.path.join("output", "render_jobs.db")
+JOBS_DIR = os.path.join("output", "jobs")
+
+# Renders allowed at the same time across all workers
+DEFAULT_MAX_RUNNING = 2
+
+# Workers started by the web app exit after this many idle seconds
+WORKER_IDLE_TIMEOUT = 300
+
+# Output of workers started by the web app, one log file per worker
+WORKER_LOG_DIR = os.path.join("output", "logs")
+
+# Workers started by this process, polled so exited ones are reaped
+_spawned_workers = []
+
+
+def key_fingerprint(api_key):
+    """
+    Identifies an API key without storing it.
+
+    Jobs record the fingerprint of the key they were submitted with, and a worker
+    only runs jobs whose fingerprint matches the key it was started with.
+
+    Args:
+        api_key (str): OpenAI API key
+
+    Returns:
+        str: Short SHA-256 fingerprint
+    """
+    return hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:16]
+
+
+def process_alive(pid):
+    """Return True if a process with this pid is running."""
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+class RenderQueue:
+    """SQLite-backed render job queue shared by the web app and the render workers"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, jobs_dir=JOBS_DIR):
+        """
+        Open (and create if needed) the job database.
+
+        Args:
+            db_path (str): SQLite database path
+            jobs_dir (str): Directory holding one isolated workspace per job
+        """
+        self.db_path = db_path
+        self.jobs_dir = jobs_dir
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    story_file TEXT NOT NULL,
+                    voice TEXT NOT NULL,
+                    platform_specs TEXT,
+                    key_fingerprint TEXT NOT NULL,
+                    workspace TEXT NOT NULL,
+                    output_file TEXT,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            # Story jobs write their story while rendering (added after the first release)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (("animal", "TEXT"), ("num_scenes", "INTEGER"),
+                                       ("force_refresh", "INTEGER NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    pid INTEGER PRIMARY KEY,
+                    key_fingerprint TEXT NOT NULL,
+                    started_at TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        """Open a connection in autocommit mode; transactions are started explicitly."""
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def submit(self, story_file, voice="alloy", platform_specs=None, api_key=None):
+        """
+        Queue a render job.
+
+        The story is copied into the job's workspace, so temporary uploads can be
+        deleted right after submitting.
+
+        Args:
+            story_file (str): Path to story JSON file
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
+            api_key (str): OpenAI API key the job must be rendered with
+
+        Returns:
+            str: Job id
+        """
+        job_id, workspace = self._new_workspace()
+        job_story_file = os.path.join(workspace, os.path.basename(story_file))
+        shutil.copyfile(story_file, job_story_file)
+
+        self._insert(job_id, workspace, job_story_file, voice, platform_specs, api_key)
+        return job_id
+
+    def submit_story(self, animal_name, num_scenes=5, voice="alloy", platform_specs=None, api_key=None,
+                     force_refresh=False):
+        """
+        Queue a job that writes a story and renders it.
+
+        The worker streams the story and starts each scene's image and narration
+        as soon as the scene arrives; the finished story is saved as the job's story_file.
+
+        Args:
+            animal_name (str): Name of the animal
+            num_scenes (int): Number of scenes to create
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
+            api_key (str): OpenAI API key the job must be rendered with
+            force_refresh (bool): Write a new story even if one is cached for this request
+
+        Returns:
+            str: Job id
+        """
+        job_id, workspace = self._new_workspace()
+        story_file = os.path.join(workspace, f"{animal_name.lower()}_openai_{job_id[:15]}.json")
+
+        self._insert(job_id, workspace, story_file, voice, platform_specs, api_key,
+                     animal=animal_name, num_scenes=num_scenes, force_refresh=int(bool(force_refresh)))
+        return job_id
+
+    def _new_workspace(self):
+        """Create the workspace of a new job and return (job_id, workspace)."""
+        job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        workspace = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(workspace, exist_ok=True)
+        return job_id, workspace
+
+    def _insert(self, job_id, workspace, story_file, voice, platform_specs, api_key, animal=None, num_scenes=None,
+                force_refresh=0):
+        """Add a queued job row."""
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, status, story_file, voice, platform_specs, key_fingerprint, workspace, "
+                "animal, num_scenes, force_refresh, created_at) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, story_file, voice, json.dumps(platform_specs), key_fingerprint(api_key), workspace,
+                 animal, num_scenes, force_refresh, datetime.now().isoformat())
+            )
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            dict: Job row, or None if unknown
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_jobs(self, job_ids=None, limit=50):
+        """
+        List jobs, newest first.
+
+        Args:
+            job_ids (list): Only these jobs, e.g. the ones submitted by one session
+            limit (int): Maximum number of jobs
+
+        Returns:
+            list: Job rows
+        """
+        with self._connect() as db:
+            if job_ids is not None:
+                if not job_ids:
+                    return []
+                placeholders = ",".join("?" for _ in job_ids)
+                rows = db.execute(
+                    f"SELECT * FROM jobs WHERE id IN ({placeholders}) ORDER BY created_at DESC LIMIT ?",
+                    (*job_ids, limit)
+                ).fetchall()
+            else:
+                rows = db.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def queue_position(self, job_id):
+        """Return how many queued jobs are ahead of a job."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < "
+                "(SELECT created_at FROM jobs WHERE id = ?)", (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def claim_next(self, fingerprint, max_running=DEFAULT_MAX_RUNNING):
+        """
+        Atomically take the oldest queued job for a key, respecting the global render limit.
+
+        Args:
+            fingerprint (str): Key fingerprint of the calling worker
+            max_running (int): Renders allowed at the same time across all workers
+
+        Returns:
+            dict: Claimed job row, or None if nothing can be started now
+        """
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            self._requeue_orphans(db)
+
+            running = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= max_running:
+                db.execute("COMMIT")
+                return None
+
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND key_fingerprint = ? ORDER BY created_at LIMIT 1",
+                (fingerprint,)
+            ).fetchone()
+            if not row:
+                db.execute("COMMIT")
+                return None
+
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = ? WHERE id = ?",
+                (os.getpid(), datetime.now().isoformat(), row["id"])
+            )
+            db.execute("COMMIT")
+            return dict(row)
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _requeue_orphans(self, db):
+        """Put running jobs whose worker died back into the queue."""
+        for row in db.execute("SELECT id, worker_pid FROM jobs WHERE status = 'running'").fetchall():
+            if not row["worker_pid"] or not process_alive(row["worker_pid"]):
+                db.execute("UPDATE jobs SET status = 'queued', worker_pid = NULL WHERE id = ?", (row["id"],))
+
+    def finish(self, job_id, output_file=None, error=None):
+        """
+        Record the result of a job.
+
+        Args:
+            job_id (str): Job id
+            output_file (str): Rendered video on success
+            error (str): Error message on failure
+        """
+        status = "succeeded" if output_file and not error else "failed"
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, output_file = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, output_file, error, datetime.now().isoformat(), job_id)
+            )
+
+    def live_workers(self, fingerprint):
+        """Return the pids of running workers for a key, forgetting dead ones."""
+        with self._connect() as db:
+            rows = db.execute("SELECT pid FROM workers WHERE key_fingerprint = ?", (fingerprint,)).fetchall()
+            pids = []
+            for row in rows:
+                if process_alive(row["pid"]):
+                    pids.append(row["pid"])
+                else:
+                    db.execute("DELETE FROM workers WHERE pid = ?", (row["pid"],))
+        return pids
+
+    def register_worker(self, fingerprint):
+        """Record the calling process as a worker."""
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO workers (pid, key_fingerprint, started_at) VALUES (?, ?, ?)",
+                (os.getpid(), fingerprint, datetime.now().isoformat())
+            )
+
+    def start_workers(self, fingerprint, count, start):
+        """
+        Start workers for a key until enough are alive, registering each as soon as it is spawned.
+
+        Counting and registering happen in one write transaction, so concurrent
+        callers cannot both start the missing workers.
+
+        Args:
+            fingerprint (str): Key fingerprint of the workers
+            count (int): Workers wanted for this key
+            start (callable): Starts one worker and returns its pid
+
+        Returns:
+            int: Number of workers started
+        """
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            alive = 0
+            for row in db.execute("SELECT pid FROM workers WHERE key_fingerprint = ?", (fingerprint,)).fetchall():
+                if process_alive(row["pid"]):
+                    alive += 1
+                else:
+                    db.execute("DELETE FROM workers WHERE pid = ?", (row["pid"],))
+
+            started = max(0, count - alive)
+            for _ in range(started):
+                db.execute(
+                    "INSERT OR REPLACE INTO workers (pid, key_fingerprint, started_at) VALUES (?, ?, ?)",
+                    (start(), fingerprint, datetime.now().isoformat())
+                )
+            db.execute("COMMIT")
+            return started
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def unregister_worker(self):
+        """Remove the calling process from the worker list."""
+        with self._connect() as db:
+            db.execute("DELETE FROM workers WHERE pid = ?", (os.getpid(),))
+
+
+def ensure_workers(api_key, count=1, db_path=DEFAULT_DB_PATH, max_running=DEFAULT_MAX_RUNNING,
+                   idle_timeout=WORKER_IDLE_TIMEOUT, log_dir=WORKER_LOG_DIR):
+    """
+    Start background render workers for an API key unless enough are already running.
+
+    The key is handed to the workers through their environment, never written to disk.
+    Workers exit once they have been idle for idle_timeout seconds, and write
+    their output to a log file in log_dir.
+
+    Args:
+        api_key (str): OpenAI API key
+        count (int): Workers wanted for this key
+        db_path (str): SQLite database path
+        max_running (int): Renders allowed at the same time across all workers
+        idle_timeout (float): Idle seconds after which a worker exits
+        log_dir (str): Directory of the worker log files
+
+    Returns:
+        int: Number of workers started
+    """
+    # Reap workers that exited, so they are no longer seen as alive
+    for process in list(_spawned_workers):
+        if process.poll() is not None:
+            _spawned_workers.remove(process)
+
+    env = dict(os.environ, OPENAI_API_KEY=api_key)
+    os.makedirs(log_dir, exist_ok=True)
+
+    def start():
+        log_file = os.path.abspath(os.path.join(
+            log_dir, f"render_worker_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.log"
+        ))
+        with open(log_file, 'ab') as log:
+            process = subprocess.Popen(
+                [sys.executable, "-u", os.path.abspath(__file__), "worker",
+                 "--db", db_path, "--max-running", str(max_running),
+                 "--idle-timeout", str(idle_timeout), "--log-file", log_file],
+                env=env, cwd=os.getcwd(), start_new_session=True,
+                stdout=log, stderr=subprocess.STDOUT
+            )
+        _spawned_workers.append(process)
+        return process.pid
+
+    return RenderQueue(db_path).start_workers(key_fingerprint(api_key), count, start)
+
+
+def run_worker(api_key, db_path=DEFAULT_DB_PATH, max_running=DEFAULT_MAX_RUNNING, poll_interval=2.0,
+               idle_timeout=None, log_file=None):
+    """
+    Render queued jobs until stopped.
+
+    Args:
+        api_key (str): OpenAI API key used for every job this worker runs
+        db_path (str): SQLite database path
+        max_running (int): Renders allowed at the same time across all workers
+        poll_interval (float): Seconds between polls of an empty queue
+        idle_timeout (float): Exit after this many idle seconds, None runs forever
+        log_file (str): Where this worker's output goes, named in the error of failed jobs
+    """
+    # Imported here so the web app can submit jobs without loading the render stack
+    from video_generator import get_image_based_generator
+    from prompt_generator import StoryStream
+
+    queue = RenderQueue(db_path)
+    fingerprint = key_fingerprint(api_key)
+    generator = get_image_based_generator(api_key)
+    queue.register_worker(fingerprint)
+    print(f"Render worker {os.getpid()} started")
+
+    idle_since = time.monotonic()
+    try:
+        while True:
+            job = queue.claim_next(fingerprint, max_running)
+            if not job:
+                if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"Rendering job {job['id']}...")
+            try:
+                platform_specs = json.loads(job["platform_specs"] or "null")
+                # A story job whose story is not written yet (a requeued job may already have it)
+                if job["animal"] and not os.path.exists(job["story_file"]):
+                    story_stream = StoryStream(generator.openai_client, job["animal"], job["num_scenes"] or 5,
+                                               force_refresh=bool(job["force_refresh"]))
+                    output_file, success, _ = generator.process_story_stream(
+                        story_stream, job["story_file"], job["workspace"], job["voice"], platform_specs
+                    )
+                else:
+                    output_file, success = generator.process_story_to_video(
+                        job["story_file"], job["workspace"], job["voice"], platform_specs
+                    )
+                if success:
+                    queue.finish(job["id"], output_file)
+                else:
+                    details = f" (details in {log_file})" if log_file else ""
+                    queue.finish(job["id"], error=f"Video rendering failed{details}")
+            except Exception as e:
+                traceback.print_exc()
+                queue.finish(job["id"], error=f"{type(e).__name__}: {str(e)}")
+            idle_since = time.monotonic()
+    finally:
+        queue.unregister_worker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background render queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="Run a render worker")
+    worker_parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    worker_parser.add_argument("--max-running", type=int, default=DEFAULT_MAX_RUNNING)
+    worker_parser.add_argument("--idle-timeout", type=float)
+    worker_parser.add_argument("--log-file", help="Log file the worker's output is sent to, shown with failed jobs")
+
+    status_parser = subparsers.add_parser("status", help="List recent jobs")
+    status_parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    status_parser.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            parser.error("OPENAI_API_KEY is not set")
+        run_worker(api_key, args.db, args.max_running, idle_timeout=args.idle_timeout, log_file=args.log_file)
+    else:
+        for job in RenderQueue(args.db).list_jobs(limit=args.limit):
+            print(f"{job['id']}  {job['status']:<9}  {job['output_file'] or job['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
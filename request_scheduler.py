@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+import metrics
+
+# Requests per minute per API key and endpoint family, overridable with OPENAI_RPM_<FAMILY>.
+# Families without a limit (e.g. image downloads from the CDN) are only retried, not paced.
+DEFAULT_RATE_LIMITS = {"chat": 500, "images": 50, "audio": 50}
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Longest Retry-After hint that is honored as given
+MAX_RETRY_AFTER = 600
+
+RETRYABLE_STATUS = (408, 409, 429)
+
+
+def rate_limits_from_env(defaults=DEFAULT_RATE_LIMITS):
+    """Returns the per-family request limits with OPENAI_RPM_<FAMILY> overrides applied."""
+    limits = dict(defaults)
+    for family in list(limits):
+        value = os.getenv(f"OPENAI_RPM_{family.upper()}")
+        if value:
+            limits[family] = float(value)
+    return limits
+
+
+def status_of(error):
+    """Returns the HTTP status of an API or HTTP error, or None."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error):
+    """
+    Decides whether a failed request is worth repeating.
+
+    Rate limits, timeouts, conflicts, server errors and dropped connections are
+    retried; client errors and exhausted quotas are not.
+
+    Args:
+        error (Exception): Raised by the request
+
+    Returns:
+        bool: True if the request should be retried
+    """
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False
+
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+
+    # Only check the exception types of SDKs that are already loaded
+    openai = sys.modules.get("openai")
+    if openai and isinstance(error, openai.APIConnectionError):
+        return True
+    requests = sys.modules.get("requests")
+    if requests and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return False
+
+
+def retry_after_seconds(error):
+    """
+    Reads the server's Retry-After hint from a failed response.
+
+    Args:
+        error (Exception): Raised by the request
+
+    Returns:
+        float: Seconds to wait, or None without a usable hint
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            seconds = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            value = headers["retry-after"]
+            try:
+                seconds = float(value)
+            except ValueError:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        else:
+            return None
+    except (TypeError, ValueError):
+        return None
+
+    return seconds if 0 <= seconds <= MAX_RETRY_AFTER else None
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces requests to a rate per minute"""
+
+    def __init__(self, requests_per_minute, capacity=None):
+        """
+        Args:
+            requests_per_minute (float): Sustained request rate
+            capacity (float): Burst size, defaults to ten seconds' worth of requests
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity or max(1.0, requests_per_minute / 6)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a request may be sent.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Holds back every request of this bucket for the given time, e.g. after a 429."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RequestScheduler:
+    """Paces and retries API requests per API key and endpoint family"""
+
+    def __init__(self, rate_limits=None, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_cap=BACKOFF_CAP):
+        """
+        Initialize the scheduler.
+
+        Args:
+            rate_limits (dict): Requests per minute per endpoint family, None for the environment defaults
+            max_retries (int): Retries of a retryable failure before giving up
+            backoff_base (float): First backoff step in seconds
+            backoff_cap (float): Longest backoff in seconds
+        """
+        self.rate_limits = rate_limits_from_env() if rate_limits is None else rate_limits
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, family, api_key):
+        """Returns the token bucket of a key and family, or None if the family is not paced."""
+        requests_per_minute = self.rate_limits.get(family)
+        if not requests_per_minute:
+            return None
+
+        key = (hashlib.sha256((api_key or "").encode('utf-8')).hexdigest(), family)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(requests_per_minute)
+            return self._buckets[key]
+
+    def backoff(self, attempt):
+        """Returns a full-jitter exponential backoff delay for a retry attempt (0-based)."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def call(self, family, api_key, function, *args, **kwargs):
+        """
+        Sends a request when the key's quota allows it, retrying retryable failures.
+
+        Args:
+            family (str): Endpoint family, e.g. "chat", "images", "audio" or "download"
+            api_key (str): API key the request is billed to
+            function (callable): Sends the request
+            *args, **kwargs: Passed to function
+
+        Returns:
+            The result of function
+
+        Raises:
+            Exception: The last error if it is not retryable or retries are exhausted
+        """
+        bucket = self.bucket(family, api_key)
+        attempt = 0
+        while True:
+            if bucket:
+                waited = bucket.acquire()
+                if waited:
+                    metrics.increment("throttle_seconds_total", waited, endpoint=family)
+
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                # A rate limit applies to every request of the key, not just this one
+                if status_of(e) == 429 and bucket:
+                    bucket.pause(delay)
+
+                attempt += 1
+                metrics.increment("retries_total", endpoint=family)
+                metrics.log_event("retry", endpoint=family, attempt=attempt, delay=round(delay, 3),
+                                  status=status_of(e), error=type(e).__name__)
+                print(f"{family} request failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s...")
+                time.sleep(delay)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler():
+    """
+    Returns the process-wide request scheduler.
+
+    Sharing it makes concurrent renders in one process draw from the same
+    per-key quota instead of each bursting on its own.
+
+    Returns:
+        RequestScheduler: Shared scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
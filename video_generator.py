@@ -2,14 +2,25 @@ import os
 import json
 import sys
 import time
+import hashlib
+import base64
+import struct
+import shutil
+import subprocess
+import threading
+import multiprocessing
+from contextlib import nullcontext
 from datetime import datetime
-from moviepy.editor import ImageClip, AudioFileClip, VideoFileClip, concatenate_videoclips
-from PIL import Image
-import requests
-from io import BytesIO
-from openai import OpenAI
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dotenv import load_dotenv
+import metrics
+from api_clients import get_http_session, get_openai_client
+from request_scheduler import get_request_scheduler
+from asset_cache import AssetCache
+from render_manifest import RenderManifest, RenderIndex, file_sha256
+from output_catalog import preview_paths, caption_paths, mp4_duration
+from captions import CAPTION_STYLE, caption_blocks, render_caption, composite_caption, write_subtitles
+from prompt_generator import save_story_to_json
 
 
 
@@ -17,180 +28,1525 @@ from dotenv import load_dotenv
 load_dotenv()
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Supported composition backends of ImageBasedVideoGenerator
+ENCODERS = ("still", "moviepy")
+
+# Part of every segment cache key; bump it when the segment encode settings change
+SEGMENT_FORMAT = 2
+
+# Video track timescale of every segment; the stream-copy concat keeps timestamps as they
+# are, so still and motion segments with different frame rates must share one
+SEGMENT_TIMESCALE = 90000
+
+# Ken Burns presets as (start zoom, end zoom, start x, end x, start y, end y). Zoom is a
+# share of the motion amount; positions run from -1 (left/top edge) to 1 (right/bottom edge)
+MOTION_PRESETS = {
+    "zoom_in": (0, 1, 0, 0, 0, 0),
+    "zoom_out": (1, 0, 0, 0, 0, 0),
+    "pan_left": (1, 1, 1, -1, 0, 0),
+    "pan_right": (1, 1, -1, 1, 0, 0),
+    "pan_up": (1, 1, 0, 0, 1, -1),
+    "pan_down": (1, 1, 0, 0, -1, 1),
+    "drift": (0.5, 1, -0.5, 0.5, -0.3, 0.3)
+}
+
+# How far a motion zooms in, or how much of the picture a pan travels across
+DEFAULT_MOTION_AMOUNT = 0.12
+
+
+def ffmpeg_binary():
+    """Return the ffmpeg executable moviepy is configured with, loading moviepy's config on first use."""
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+
+def wav_duration(audio_file):
+    """
+    Reads the duration of a PCM WAV file from its header, without decoding it.
+    
+    Streamed WAV responses may carry a placeholder data size, so the sample count
+    is derived from the bytes actually present when the header value is larger.
+    
+    Args:
+        audio_file (str): WAV file path
+    
+    Returns:
+        float: Duration in seconds, or None if the file is not a WAV file
+    """
+    file_size = os.path.getsize(audio_file)
+    with open(audio_file, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+        
+        byte_rate = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                byte_rate = struct.unpack('<I', fmt[8:12])[0]
+                if chunk_size % 2:
+                    f.read(1)
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    return None
+                data_size = min(chunk_size, file_size - f.tell())
+                return data_size / byte_rate
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def probe_audio_duration(audio_file):
+    """
+    Returns the duration of an audio file, reading WAV headers in-process.
+    
+    Other formats fall back to decoding the file with moviepy.
+    
+    Args:
+        audio_file (str): Audio file path
+    
+    Returns:
+        float: Duration in seconds
+    """
+    with metrics.timer("duration_probe") as span:
+        duration = wav_duration(audio_file)
+        span["method"] = "wav_header"
+        if duration is None:
+            span["method"] = "decode"
+            from moviepy.audio.io.AudioFileClip import AudioFileClip
+            audio_clip = AudioFileClip(audio_file)
+            duration = audio_clip.duration
+            audio_clip.close()
+    return duration
+
+
+def fit_image(image_file, output_file, width, height):
+    """
+    Scales and center-crops an image to exactly width x height with Lanczos resampling.
+    
+    Args:
+        image_file (str): Source image path
+        output_file (str): Output image path (.png)
+        width (int): Target width
+        height (int): Target height
+    
+    Returns:
+        bool: True on success
+    """
+    from PIL import Image, ImageOps
+    
+    with Image.open(image_file) as image:
+        fitted = ImageOps.fit(image.convert("RGB"), (width, height), method=Image.LANCZOS)
+    fitted.save(output_file, "PNG", compress_level=1)
+    return True
+
+
+def encode_still_segment(image_file, audio_file, output_file, width=None, height=None, fps=2, threads=0, duration=None):
+    """
+    Encodes one scene straight from its still image and narration with ffmpeg.
+    
+    The image is fed as a looped input at a low frame rate and x264 is tuned for
+    still images, so no frames are rendered in Python. A list of images, e.g. one
+    per caption block, is read with the concat demuxer instead.
+    
+    Args:
+        image_file (str or list): Scene image path, or (image path, seconds) pairs shown in turn
+        audio_file (str): Scene audio path
+        output_file (str): Output segment path (.mp4)
+        width (int): Output width, None keeps the image size
+        height (int): Output height, None keeps the image size
+        fps (int): Frame rate of the encoded segment
+        threads (int): x264 threads, 0 lets ffmpeg decide
+        duration (float): Narration length; the segment ends with the audio when omitted
+    """
+    video_filter = "format=yuv420p"
+    if width and height:
+        video_filter = f"scale={width}:{height},{video_filter}"
+    
+    list_file = None
+    if isinstance(image_file, str):
+        image_input = ["-loop", "1", "-framerate", str(fps), "-i", image_file]
+    else:
+        list_file = f"{output_file}.images.txt"
+        write_image_list(image_file, list_file)
+        image_input = ["-f", "concat", "-safe", "0", "-i", list_file]
+        # The demuxer yields one frame per image; repeat them at the segment rate
+        video_filter = f"fps={fps},{video_filter}"
+    
+    command = [
+        ffmpeg_binary(), "-y", "-loglevel", "error",
+        *image_input,
+        "-i", audio_file,
+        "-vf", video_filter,
+        "-c:v", "libx264", "-tune", "stillimage", "-preset", "veryfast", "-r", str(fps),
+        "-threads", str(threads), "-video_track_timescale", str(SEGMENT_TIMESCALE),
+        "-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2"
+    ]
+    command += ["-t", f"{duration:.3f}"] if duration else ["-shortest"]
+    command.append(output_file)
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    finally:
+        if list_file:
+            os.remove(list_file)
+
+
+def write_image_list(images, list_file):
+    """
+    Writes a concat demuxer list that shows each image for its duration.
+    
+    Args:
+        images (list): (image path, seconds) pairs in playback order
+        list_file (str): Output list path
+    """
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for image_file, seconds in images:
+            escaped = os.path.abspath(image_file).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\nduration {seconds:.3f}\n")
+        # The concat demuxer ignores the duration of the last entry
+        escaped = os.path.abspath(images[-1][0]).replace("'", "'\\''")
+        f.write(f"file '{escaped}'\n")
+
+
+def composite_captions(image_file, captions, output_file):
+    """
+    Burns each caption block of a scene into its own copy of the scene image.
+    
+    Args:
+        image_file (str): Prepared scene image path
+        captions (list): (overlay_file, start, end) per caption block, covering the scene
+        output_file (str): Segment path the composited images are named after
+    
+    Returns:
+        list: (image path, seconds) per caption block
+    """
+    images = []
+    for i, (overlay_file, start, end) in enumerate(captions, 1):
+        captioned_file = f"{output_file}.caption_{i}.png"
+        composite_caption(image_file, overlay_file, captioned_file)
+        images.append((captioned_file, end - start))
+    return images
+
+
+def yuv_planes(image):
+    """
+    Splits an image into limited-range BT.601 Y, Cb and Cr planes, as the still segments are encoded.
+    
+    Args:
+        image (PIL.Image.Image): Source image
+    
+    Returns:
+        list: Y, Cb and Cr as full-size 'L' images
+    """
+    import numpy as np
+    from PIL import Image
+    
+    # PIL converts to full-range BT.601
+    ycbcr = np.asarray(image.convert("RGB").convert("YCbCr"), dtype=np.float32)
+    return [
+        Image.fromarray(np.rint(16 + ycbcr[..., 0] * (219 / 255)).astype(np.uint8)),
+        Image.fromarray(np.rint(128 + (ycbcr[..., 1] - 128) * (224 / 255)).astype(np.uint8)),
+        Image.fromarray(np.rint(128 + (ycbcr[..., 2] - 128) * (224 / 255)).astype(np.uint8))
+    ]
+
+
+def caption_planes(overlay_file):
+    """
+    Prepares a caption overlay for blending into yuv420p frames.
+    
+    Only the opaque part of the overlay is kept, aligned to even coordinates so
+    it lines up with the half-size chroma planes.
+    
+    Args:
+        overlay_file (str): RGBA caption overlay from render_caption()
+    
+    Returns:
+        tuple: ((left, top), luma images (Y, alpha), chroma images (Cb, Cr, alpha)), or None if it is empty
+    """
+    from PIL import Image
+    
+    with Image.open(overlay_file) as overlay:
+        overlay = overlay.convert("RGBA")
+    bbox = overlay.getchannel("A").getbbox()
+    if not bbox:
+        return None
+    left, top = bbox[0] // 2 * 2, bbox[1] // 2 * 2
+    right = min(overlay.width, (bbox[2] + 1) // 2 * 2)
+    bottom = min(overlay.height, (bbox[3] + 1) // 2 * 2)
+    overlay = overlay.crop((left, top, right, bottom))
+    
+    luma, cb, cr = yuv_planes(overlay)
+    alpha = overlay.getchannel("A")
+    half_size = ((right - left) // 2, (bottom - top) // 2)
+    chroma = [plane.resize(half_size, Image.BILINEAR) for plane in (cb, cr, alpha)]
+    return (left, top), (luma, alpha), chroma
+
+
+def scene_motion(scene):
+    """
+    Reads the optional camera motion of a scene from the story JSON.
+    
+    A scene may set "motion" to a preset name, e.g. "zoom_in", or to
+    {"type": "pan_left", "amount": 0.2}. Scenes without it stay still.
+    
+    Args:
+        scene (dict): Scene data
+    
+    Returns:
+        dict: Motion type and amount, or None for a still scene
+    """
+    motion = (scene or {}).get("motion")
+    if not motion or motion == "none":
+        return None
+    if isinstance(motion, str):
+        motion = {"type": motion}
+    
+    try:
+        if motion.get("type") not in MOTION_PRESETS:
+            raise ValueError(f"unknown type {motion.get('type')}")
+        amount = min(max(float(motion.get("amount", DEFAULT_MOTION_AMOUNT)), 0.01), 0.5)
+    except (AttributeError, TypeError, ValueError) as e:
+        print(f"Invalid scene motion ({str(e)}), rendering a still scene")
+        return None
+    return {"type": motion["type"], "amount": amount}
+
+
+def motion_windows(motion, frame_count, source_size):
+    """
+    Computes the crop window of every frame of a Ken Burns motion at once.
+    
+    The source is pre-scaled to (1 + amount) times the output size, so the
+    closest zoom shows it pixel for pixel and the widest shows all of it.
+    
+    Args:
+        motion (dict): Motion type and amount from scene_motion()
+        frame_count (int): Frames in the segment
+        source_size (tuple): (width, height) of the pre-scaled source image
+    
+    Returns:
+        numpy.ndarray: (frame_count, 4) float boxes as (left, top, right, bottom)
+    """
+    import numpy as np
+    
+    start_zoom, end_zoom, start_x, end_x, start_y, end_y = MOTION_PRESETS[motion["type"]]
+    source_width, source_height = source_size
+    
+    time_share = np.linspace(0.0, 1.0, frame_count)
+    # Ease in and out, so the camera does not start or stop abruptly
+    progress = time_share * time_share * (3 - 2 * time_share)
+    
+    zoom = 1 + motion["amount"] * (start_zoom + (end_zoom - start_zoom) * progress)
+    window_width = source_width / zoom
+    window_height = source_height / zoom
+    center_x = (source_width + (source_width - window_width) * (start_x + (end_x - start_x) * progress)) / 2
+    center_y = (source_height + (source_height - window_height) * (start_y + (end_y - start_y) * progress)) / 2
+    
+    return np.stack([center_x - window_width / 2, center_y - window_height / 2,
+                     center_x + window_width / 2, center_y + window_height / 2], axis=1)
+
+
+def encode_motion_segment(image_file, audio_file, output_file, width, height, fps=24, threads=0, duration=None,
+                          motion=None, preset="veryfast", captions=None):
+    """
+    Encodes one scene with a Ken Burns motion over its still image.
+    
+    The source is split once into limited-range Y, U and V planes with chroma at
+    half size, and all crop windows are computed up front. Each frame is then
+    one resample per plane, piped to ffmpeg as raw yuv420p, so neither Python
+    nor ffmpeg converts colors per frame. Captions are converted once too and
+    blended into the frames over their own small area.
+    
+    Args:
+        image_file (str): Scene image pre-scaled by (1 + amount)
+        audio_file (str): Scene audio path
+        output_file (str): Output segment path (.mp4)
+        width (int): Output width
+        height (int): Output height
+        fps (int): Frame rate of the encoded segment
+        threads (int): x264 threads, 0 lets ffmpeg decide
+        duration (float): Narration length, read from the audio when omitted
+        motion (dict): Motion type and amount from scene_motion()
+        preset (str): x264 preset, matching the still segments it is joined with
+        captions (list): (overlay_file, start, end) per caption block, None for no captions
+    """
+    import numpy as np
+    from PIL import Image
+    
+    duration = duration or probe_audio_duration(audio_file)
+    frame_count = max(1, int(round(duration * fps)))
+    
+    with Image.open(image_file) as source:
+        luma, cb, cr = yuv_planes(source)
+    chroma_size = ((luma.width + 1) // 2, (luma.height + 1) // 2)
+    chroma = [plane.resize(chroma_size, Image.BILINEAR) for plane in (cb, cr)]
+    del cb, cr
+    
+    # Caption block shown in each frame, -1 for none
+    caption_planes_list = [caption_planes(overlay_file) for overlay_file, _, _ in captions or []]
+    frame_captions = np.full(frame_count, -1)
+    if captions:
+        starts = np.array([start for _, start, _ in captions])
+        frame_captions = np.searchsorted(starts, np.arange(frame_count) / fps, side="right") - 1
+    
+    windows = motion_windows(motion, frame_count, luma.size)
+    chroma_windows = windows * (chroma_size[0] / luma.width, chroma_size[1] / luma.height,
+                                chroma_size[0] / luma.width, chroma_size[1] / luma.height)
+    
+    command = [
+        ffmpeg_binary(), "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "yuv420p", "-s", f"{width}x{height}", "-framerate", str(fps), "-i", "-",
+        "-i", audio_file,
+        "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p", "-r", str(fps),
+        "-threads", str(threads), "-video_track_timescale", str(SEGMENT_TIMESCALE),
+        "-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2",
+        "-t", f"{duration:.3f}", output_file
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for box, chroma_box, caption in zip(windows.tolist(), chroma_windows.tolist(), frame_captions.tolist()):
+            planes = [luma.resize((width, height), Image.BILINEAR, box=box)]
+            planes += [plane.resize((width // 2, height // 2), Image.BILINEAR, box=chroma_box) for plane in chroma]
+            if caption >= 0 and caption_planes_list[caption]:
+                (left, top), (caption_luma, alpha), (caption_cb, caption_cr, chroma_alpha) = caption_planes_list[caption]
+                planes[0].paste(caption_luma, (left, top), alpha)
+                planes[1].paste(caption_cb, (left // 2, top // 2), chroma_alpha)
+                planes[2].paste(caption_cr, (left // 2, top // 2), chroma_alpha)
+            for plane in planes:
+                process.stdin.write(plane.tobytes())
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    finally:
+        stderr = process.stderr.read()
+        process.wait()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr)
+
+
+def encode_moviepy_segment(image_file, audio_file, output_file, width=None, height=None, fps=24, threads=0, duration=None):
+    """
+    Encodes one scene by rendering its frames through moviepy.
+    
+    Args:
+        image_file (str or list): Scene image path, or (image path, seconds) pairs shown in turn
+        audio_file (str): Scene audio path
+        output_file (str): Output segment path (.mp4)
+        width (int): Output width, None keeps the image size
+        height (int): Output height, None keeps the image size
+        fps (int): Frame rate of the encoded segment
+        threads (int): x264 threads, 0 lets ffmpeg decide
+        duration (float): Narration length, read from the audio when omitted
+    """
+    # moviepy.editor also attaches the fx methods such as resize
+    from moviepy.editor import AudioFileClip, ImageClip, concatenate_videoclips
+    
+    audio_clip = AudioFileClip(audio_file)
+    if isinstance(image_file, str):
+        image_clip = ImageClip(image_file, duration=duration or audio_clip.duration)
+    else:
+        image_clip = concatenate_videoclips([ImageClip(path, duration=seconds) for path, seconds in image_file])
+    if width and height:
+        image_clip = image_clip.resize(newsize=(width, height))
+    video_clip = image_clip.set_audio(audio_clip)
+    
+    try:
+        video_clip.write_videofile(
+            output_file, fps=fps, codec="libx264", audio_codec="aac", audio_fps=44100,
+            threads=threads or None, ffmpeg_params=["-video_track_timescale", str(SEGMENT_TIMESCALE)],
+            verbose=False, logger=None
+        )
+    finally:
+        video_clip.close()
+        audio_clip.close()
+
+
+def encode_pool_context():
+    """
+    Returns the multiprocessing context of the segment encode pool.
+    
+    Renders run next to thread pools that may hold the metrics, cache or
+    scheduler locks; forking such a process can deadlock the child, so workers
+    are started from a clean forkserver process (spawn where that is unavailable).
+    
+    Returns:
+        multiprocessing.context.BaseContext: Pool context
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def encode_segment(job):
+    """
+    Process pool entry point that encodes one scene segment.
+    
+    Scenes with a motion are rendered by encode_motion_segment with either encoder.
+    Captions of still scenes are burned into copies of the scene image first.
+    
+    Args:
+        job (dict): encoder, image_file, audio_file, output_file, width, height, fps,
+            threads, duration and optionally motion and captions
+    
+    Returns:
+        str: Encoded segment path
+    """
+    if job.get("motion"):
+        # moviepy encodes with x264's default preset; segments joined by stream copy must match
+        preset = "veryfast" if job["encoder"] == "still" else "medium"
+        encode_motion_segment(job["image_file"], job["audio_file"], job["output_file"], job["width"],
+                              job["height"], job["fps"], job["threads"], job.get("duration"), job["motion"], preset,
+                              job.get("captions"))
+        return job["output_file"]
+    
+    image_file = job["image_file"]
+    if job.get("captions"):
+        image_file = composite_captions(image_file, job["captions"], job["output_file"])
+    
+    encode = encode_still_segment if job["encoder"] == "still" else encode_moviepy_segment
+    try:
+        encode(image_file, job["audio_file"], job["output_file"],
+               job["width"], job["height"], job["fps"], job["threads"], job.get("duration"))
+    finally:
+        if not isinstance(image_file, str):
+            for captioned_file, _ in image_file:
+                os.remove(captioned_file)
+    return job["output_file"]
+
+
+def available_cpus():
+    """Return the number of CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def concat_segments(segment_files, output_file):
+    """
+    Joins encoded segments into one video without re-encoding.
+    
+    Args:
+        segment_files (list): Segment paths in playback order
+        output_file (str): Output video path
+    """
+    list_file = f"{output_file}.segments.txt"
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for segment_file in segment_files:
+            escaped = os.path.abspath(segment_file).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    
+    try:
+        command = [
+            ffmpeg_binary(), "-y", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_file,
+            "-c", "copy", "-movflags", "+faststart", output_file
+        ]
+        subprocess.run(command, check=True, capture_output=True)
+    finally:
+        os.remove(list_file)
+
+def make_poster(image_file, output_file, max_side=480):
+    """
+    Writes a small JPEG poster from a scene image.
+    
+    Args:
+        image_file (str): Prepared scene image path
+        output_file (str): Output JPEG path
+        max_side (int): Longest side of the poster in pixels
+    """
+    from PIL import Image
+    
+    with Image.open(image_file) as image:
+        poster = image.convert("RGB")
+        poster.thumbnail((max_side, max_side), Image.LANCZOS)
+    poster.save(output_file, "JPEG", quality=80, optimize=True)
+
+
+def encode_preview(image_files, audio_files, durations, output_file, max_side=480, fps=2):
+    """
+    Encodes a low-resolution, low-bitrate preview of a video from its scene images and narration.
+    
+    All scenes go through a single ffmpeg run: the images are read with the concat
+    demuxer, each shown for its narration length, and downscaled before encoding.
+    
+    Args:
+        image_files (list): Prepared scene images in playback order
+        audio_files (list): Scene narration files in playback order
+        durations (list): Narration length of each scene in seconds
+        output_file (str): Output preview path (.mp4)
+        max_side (int): Longest side of the preview in pixels
+        fps (int): Frame rate of the preview
+    """
+    def escape(path):
+        return os.path.abspath(path).replace("'", "'\\''")
+    
+    image_list = f"{output_file}.images.txt"
+    audio_list = f"{output_file}.audio.txt"
+    write_image_list(list(zip(image_files, durations)), image_list)
+    with open(audio_list, 'w', encoding='utf-8') as f:
+        for audio_file in audio_files:
+            f.write(f"file '{escape(audio_file)}'\n")
+    
+    from PIL import Image
+    
+    with Image.open(image_files[0]) as image:
+        width, height = image.size
+    scale = f"scale=-2:{max_side}" if height >= width else f"scale={max_side}:-2"
+    
+    try:
+        command = [
+            ffmpeg_binary(), "-y", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", image_list,
+            "-f", "concat", "-safe", "0", "-i", audio_list,
+            "-vf", f"{scale},format=yuv420p", "-r", str(fps),
+            "-c:v", "libx264", "-tune", "stillimage", "-preset", "veryfast", "-crf", "32",
+            "-c:a", "aac", "-b:a", "48k", "-ac", "1",
+            "-t", f"{sum(durations):.3f}", "-movflags", "+faststart", output_file
+        ]
+        subprocess.run(command, check=True, capture_output=True)
+    finally:
+        os.remove(image_list)
+        os.remove(audio_list)
+
 class VideoGenerator:
     """Unified video generator class for all video generation methods"""
     
     def __init__(self, openai_api_key=None):
         """
-        Initialize the video generator with API keys.
+        Initialize the video generator with API keys.
+        
+        Args:
+            openai_api_key (str): OpenAI API key
+        """
+        self.openai_api_key = openai_api_key or OPENAI_API_KEY
+        
+        # Share one pooled OpenAI client per key across generators and jobs
+        self.openai_client = get_openai_client(self.openai_api_key)
+
+class ImageBasedVideoGenerator(VideoGenerator):
+    """Image-based video generator using OpenAI DALL-E + TTS"""
+    
+    image_model = "dall-e-3"
+    image_quality = "standard"
+    tts_model = "tts-1"
+    tts_format = "wav"
+    
+    fps = 24
+    still_fps = 2
+    # Pans and zooms move less than a pixel per frame, so 15 fps looks as smooth as 24
+    motion_fps = 15
+    preview_max_side = 480
+    
+    def __init__(self, openai_api_key=None, max_concurrency=4, cache_dir=os.path.join("output", "cache"),
+                 image_cache_max_bytes=2 * 1024 ** 3, audio_cache_max_bytes=512 * 1024 ** 2, encoder="still",
+                 encode_workers=None, prepared_cache_max_bytes=1024 ** 3, image_response_format="url",
+                 segment_cache_max_bytes=2 * 1024 ** 3, burn_captions=True):
+        """
+        Initialize the image-based video generator.
+        
+        Args:
+            openai_api_key (str): OpenAI API key
+            max_concurrency (int): Maximum number of image/TTS requests in flight at once
+                (1 runs every request sequentially)
+            cache_dir (str): Directory for the persistent asset caches
+            image_cache_max_bytes (int): Disk budget of the image cache
+            audio_cache_max_bytes (int): Disk budget of the narration audio cache
+            encoder (str): 'still' encodes scenes directly with ffmpeg, 'moviepy'
+                renders every frame through moviepy
+            encode_workers (int): Number of scene segments encoded in parallel
+                processes, defaults to the available CPU cores
+            prepared_cache_max_bytes (int): Disk budget of the resized scene image cache
+            image_response_format (str): 'url' downloads each image from the returned URL,
+                'b64_json' receives it inline and saves a second round trip
+            segment_cache_max_bytes (int): Disk budget of the encoded scene segment cache
+            burn_captions (bool): Burn the narration into the video as captions; SRT and
+                WebVTT sidecars are written either way
+        
+        Finished renders are indexed by fingerprint in cache_dir/renders.db, so an
+        identical render request returns the existing video.
+        """
+        super().__init__(openai_api_key)
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown encoder: {encoder}")
+        if image_response_format not in ("url", "b64_json"):
+            raise ValueError(f"Unknown image response format: {image_response_format}")
+        self.image_response_format = image_response_format
+        
+        # Optional semaphores limiting how many stories are in each stage at once
+        # when one generator is shared by several concurrent renders
+        self.story_slots = None
+        self.asset_slots = None
+        self.encode_slots = None
+        self.encoder = encoder
+        self.burn_captions = burn_captions
+        self.encode_workers = max(1, int(encode_workers or available_cpus()))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.image_cache = AssetCache(os.path.join(cache_dir, "images"), image_cache_max_bytes)
+        self.audio_cache = AssetCache(os.path.join(cache_dir, "audio"), audio_cache_max_bytes)
+        self.prepared_cache = AssetCache(os.path.join(cache_dir, "prepared"), prepared_cache_max_bytes)
+        self.segment_cache = AssetCache(os.path.join(cache_dir, "segments"), segment_cache_max_bytes)
+        self.render_index = RenderIndex(os.path.join(cache_dir, "renders.db"))
+    
+    def generate_tts_openai(self, text, output_file, voice="alloy"):
+        """
+        Converts text to audio file using OpenAI TTS API.
+        
+        Args:
+            text (str): Text to convert
+            output_file (str): Output audio file path
+            voice (str): Voice model (alloy, echo, fable, onyx, nova, shimmer)
+        """
+        try:
+            if not self.openai_client:
+                raise Exception("OpenAI client not initialized")
+                
+            # Request and body download are retried together
+            def synthesize():
+                response = self.openai_client.audio.speech.create(
+                    model=self.tts_model,
+                    voice=voice,
+                    input=text,
+                    response_format=self.tts_format
+                )
+                response.stream_to_file(output_file)
+            
+            with metrics.timer("tts", voice=voice):
+                get_request_scheduler().call("audio", self.openai_client.api_key, synthesize)
+            print(f"Audio created with OpenAI TTS: {output_file}")
+            return True
+        except Exception as e:
+            print(f"OpenAI TTS error: {str(e)}")
+            return False
+
+    def get_scene_audio(self, text, voice="alloy"):
+        """
+        Returns scene narration from the audio cache, generating it on a miss.
+        
+        Audio is keyed by (model, voice, narration hash, format), so it is reused by
+        any render of the same narration regardless of images or aspect ratio. The
+        duration is stored with the cached file, so it is only measured once.
+        
+        Args:
+            text (str): Narration text
+            voice (str): Voice model (alloy, echo, fable, onyx, nova, shimmer)
+        
+        Returns:
+            str: Cached audio path, or None if generation failed
+        """
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        key = AssetCache.make_key(self.tts_model, voice, text_hash, self.tts_format)
+        path = self.audio_cache.get_or_create(
+            key, f".{self.tts_format}", lambda tmp_file: self.generate_tts_openai(text, tmp_file, voice)
+        )
+        if path:
+            self.get_audio_duration(path)
+            print(f"Scene audio ready: {path}")
+        return path
+
+    def get_audio_duration(self, audio_file):
+        """
+        Returns the duration of a narration file, using the value stored in the audio cache when present.
+        
+        Args:
+            audio_file (str): Audio file path
+        
+        Returns:
+            float: Duration in seconds
+        """
+        if not self.audio_cache.contains(audio_file):
+            return probe_audio_duration(audio_file)
+        
+        meta = self.audio_cache.read_meta(audio_file)
+        if "duration" not in meta:
+            meta["duration"] = probe_audio_duration(audio_file)
+            self.audio_cache.write_meta(audio_file, meta)
+        return meta["duration"]
+
+    def enhance_image_prompt(self, prompt):
+        """
+        Wraps a scene prompt with the general style instructions sent to DALL-E.
+        
+        Args:
+            prompt (str): Image generation prompt
+        
+        Returns:
+            str: Enhanced prompt
+        """
+        return f"""
+            Create a high-quality, engaging illustration for this scene:
+            {prompt}
+            
+            The image should be:
+            - Visually appealing and professional
+            - Clear and easy to understand
+            - Colorful and engaging
+            - Detailed but not cluttered
+            - Consistent with the overall story style
+            """
+
+    def get_scene_image(self, prompt, image_size="1024x1792"):
+        """
+        Returns a scene image from the image cache, generating it on a miss.
+        
+        Images are keyed by (model, enhanced prompt, size, quality), so the same
+        prompt is only paid for once across renders and within a story.
+        
+        Args:
+            prompt (str): Image generation prompt
+            image_size (str): Image size (1024x1024, 1024x1792, 1792x1024)
+        
+        Returns:
+            str: Cached image path, or None if generation failed
+        """
+        key = AssetCache.make_key(self.image_model, self.enhance_image_prompt(prompt), image_size, self.image_quality)
+        path = self.image_cache.get_or_create(
+            key, ".png", lambda tmp_file: self.generate_image_with_openai(prompt, tmp_file, image_size)
+        )
+        if path:
+            print(f"Scene image ready: {path}")
+        return path
+
+    def generate_image_with_openai(self, prompt, output_file, image_size="1024x1792"):
+        """
+        Creates image using OpenAI DALL-E API.
+        
+        Args:
+            prompt (str): Image generation prompt
+            output_file (str): Output image file path
+            image_size (str): Image size (1024x1024, 1024x1792, 1792x1024)
+        """
+        try:
+            if not self.openai_client:
+                raise Exception("OpenAI client not initialized")
+                
+            # Send request to OpenAI DALL-E API
+            scheduler = get_request_scheduler()
+            with metrics.timer("image", size=image_size):
+                response = scheduler.call(
+                    "images", self.openai_client.api_key, self.openai_client.images.generate,
+                    model=self.image_model,
+                    prompt=self.enhance_image_prompt(prompt),
+                    size=image_size,
+                    quality=self.image_quality,
+                    response_format=self.image_response_format,
+                    n=1
+                )
+            
+            # Inline payload needs no download
+            if self.image_response_format == "b64_json":
+                with open(output_file, 'wb') as f:
+                    f.write(base64.b64decode(response.data[0].b64_json))
+                print(f"Image successfully created: {output_file}")
+                return True
+            
+            # Get image URL
+            image_url = response.data[0].url
+            
+            # Stream image to disk over the pooled session
+            def download():
+                with get_http_session().get(image_url, stream=True, timeout=60) as image_response:
+                    image_response.raise_for_status()
+                    with open(output_file, 'wb') as f:
+                        for chunk in image_response.iter_content(chunk_size=64 * 1024):
+                            f.write(chunk)
+            
+            with metrics.timer("download") as span:
+                scheduler.call("download", self.openai_client.api_key, download)
+                span["bytes"] = os.path.getsize(output_file)
+            print(f"Image successfully created: {output_file}")
+            return True
+                
+        except Exception as e:
+            print(f"Image creation error: {str(e)}")
+            return False
+
+    def create_scene(self, scene_data, scene_number, output_dir, story_context=None, voice="alloy", platform_specs=None):
+        """
+        Creates a single scene using OpenAI DALL-E + TTS.
+        
+        Args:
+            scene_data (dict): Scene data
+            scene_number (int): Scene number
+            output_dir (str): Output directory
+            story_context (dict): Story context
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications with width, height, etc.
+        
+        Returns:
+            tuple: (video_clip, duration)
+        """
+        image_size = self.get_image_size(platform_specs)
+        
+        # Create image
+        image_file = self.get_scene_image(scene_data["image_prompt"], image_size)
+        if not image_file:
+            return None, 0
+        
+        # Create audio
+        audio_file = self.get_scene_audio(scene_data["narration"], voice)
+        if not audio_file:
+            return None, 0
+        
+        return self.build_scene_clip(image_file, audio_file, platform_specs)
+
+    def get_image_size(self, platform_specs=None):
+        """
+        Map platform specs to a supported DALL-E image size.
+        
+        Args:
+            platform_specs (dict): Platform specifications with width, height, etc.
+        
+        Returns:
+            str: DALL-E image size
+        """
+        image_size = "1024x1792"  # Default
+        if platform_specs:
+            width = platform_specs.get('width', 1024)
+            height = platform_specs.get('height', 1792)
+            
+            # Map to supported DALL-E sizes
+            if width == height:  # Square
+                image_size = "1024x1024"
+            elif width > height:  # Landscape
+                image_size = "1792x1024"
+            else:  # Portrait
+                image_size = "1024x1792"
+        return image_size
+
+    def prepare_scene_image(self, image_file, platform_specs=None):
+        """
+        Resizes and crops a scene image to the platform size once, caching the result.
+        
+        Prepared images are keyed by (source image hash, width, height), so
+        composition never has to resize frames.
+        
+        Args:
+            image_file (str): Source scene image path
+            platform_specs (dict): Platform specifications with width, height, etc.
+        
+        Returns:
+            str: Path of an image with the target size, or None on failure
+        """
+        if not platform_specs:
+            return image_file
+        
+        from PIL import Image
+        
+        width = platform_specs.get('width', 1080)
+        height = platform_specs.get('height', 1920)
+        try:
+            with Image.open(image_file) as image:
+                if image.size == (width, height):
+                    return image_file
+            
+            key = AssetCache.make_key(file_sha256(image_file), width, height)
+            return self.prepared_cache.get_or_create(
+                key, ".png", lambda tmp_file: fit_image(image_file, tmp_file, width, height)
+            )
+        except Exception as e:
+            print(f"Image preparation error: {str(e)}")
+            return None
+
+    def output_size(self, image_file, platform_specs=None):
+        """
+        Returns the size a scene is rendered at.
+        
+        Args:
+            image_file (str): Scene image path
+            platform_specs (dict): Platform specifications with width, height, etc.
+        
+        Returns:
+            tuple: (width, height) of the platform, or of the image without platform specs
+        """
+        if platform_specs:
+            return platform_specs.get('width', 1080), platform_specs.get('height', 1920)
+        
+        from PIL import Image
+        
+        with Image.open(image_file) as image:
+            return image.size
+
+    def segment_fps(self, motion=None):
+        """
+        Returns the frame rate a scene's segment is encoded at.
+        
+        Args:
+            motion (dict): Scene motion from scene_motion(), None for a still scene
+        
+        Returns:
+            int: Frames per second
+        """
+        if motion:
+            return self.motion_fps
+        return self.still_fps if self.encoder == "still" else self.fps
+
+    def scene_captions(self, text, duration, width, height, fps=None):
+        """
+        Lays out the caption blocks of a scene's narration and rasterizes each block once.
+        
+        Overlays are cached by (lines, frame size, style), so a caption is only
+        drawn again when its text changes. Blocks change on frames of the scene's
+        segment and are shown for at least one still frame.
+        
+        Args:
+            text (str): Narration text
+            duration (float): Narration length in seconds
+            width (int): Frame width
+            height (int): Frame height
+            fps (int): Frame rate of the scene's segment
+        
+        Returns:
+            list: (start, end, lines, overlay_file) per block; overlay_file is None when
+                captions are not burned in or could not be drawn
+        """
+        try:
+            blocks = caption_blocks(text, duration, width, height, fps, 1 / self.still_fps)
+        except Exception as e:
+            print(f"Caption error: {str(e)}")
+            return []
+        if not self.burn_captions:
+            return [(start, end, lines, None) for start, end, lines in blocks]
+        
+        captions = []
+        try:
+            for start, end, lines in blocks:
+                key = AssetCache.make_key("caption", CAPTION_STYLE, lines, width, height)
+                overlay_file = self.prepared_cache.get_or_create(
+                    key, ".png", lambda tmp_file, lines=lines: render_caption(lines, width, height, tmp_file)
+                )
+                captions.append((start, end, lines, overlay_file))
+        except Exception as e:
+            print(f"Caption error: {str(e)}")
+            return [(start, end, lines, None) for start, end, lines in blocks]
+        return captions
+
+    def prepare_motion_image(self, image_file, motion, platform_specs=None):
+        """
+        Pre-scales a scene image for a motion to (1 + amount) times the output size, caching the result.
+        
+        Args:
+            image_file (str): Source scene image path
+            motion (dict): Motion type and amount from scene_motion()
+            platform_specs (dict): Platform specifications with width, height, etc.
+        
+        Returns:
+            tuple: (prepared image path, (output width, output height)), or (None, None) on failure
+        """
+        try:
+            width, height = self.output_size(image_file, platform_specs)
+        except Exception as e:
+            print(f"Image preparation error: {str(e)}")
+            return None, None
+        
+        scale = 1 + motion["amount"]
+        prepared_file = self.prepare_scene_image(
+            image_file, {'width': round(width * scale), 'height': round(height * scale)}
+        )
+        return prepared_file, (width, height)
+
+    def build_scene_clip(self, image_file, audio_file, platform_specs=None):
+        """
+        Builds a video clip from an already generated scene image and narration.
+        
+        Args:
+            image_file (str): Scene image path
+            audio_file (str): Scene audio path
+            platform_specs (dict): Platform specifications with width, height, etc.
+        
+        Returns:
+            tuple: (video_clip, duration)
+        """
+        from moviepy.audio.io.AudioFileClip import AudioFileClip
+        from moviepy.video.VideoClip import ImageClip
+        
+        try:
+            duration = self.get_audio_duration(audio_file)
+            audio_clip = AudioFileClip(audio_file)
+            
+            # Create image clip with audio duration from the image prepared at the platform size
+            prepared_file = self.prepare_scene_image(image_file, platform_specs)
+            if not prepared_file:
+                return None, 0
+            image_clip = ImageClip(prepared_file, duration=duration)
+            
+            # Combine image and audio
+            video_clip = image_clip.set_audio(audio_clip)
+            
+            return video_clip, duration
+            
+        except Exception as e:
+            print(f"Scene creation error: {str(e)}")
+            return None, 0
+
+    def generate_scene_assets(self, scenes, output_dir, voice="alloy", platform_specs=None, manifest=None):
+        """
+        Generates images and narration for all scenes through a bounded thread pool.
+        
+        Every image and TTS request is submitted independently, so a story costs
+        roughly as long as its slowest request instead of the sum of all of them.
+        A failed request only affects its own scene.
         
         Args:
-            openai_api_key (str): OpenAI API key
+            scenes (list): Scene data list from the story JSON
+            output_dir (str): Output directory
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
+            manifest (RenderManifest): Checkpoint to resume from and record into
+        
+        Returns:
+            list: (image_file, audio_file) per scene in story order, None for failed scenes
         """
-        self.openai_api_key = openai_api_key or OPENAI_API_KEY
+        image_size = self.get_image_size(platform_specs)
         
-        # Initialize OpenAI client if key is provided
-        if self.openai_api_key:
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
-        else:
-            self.openai_client = None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            jobs = []
+            image_futures = {}
+            for i, scene in enumerate(scenes, 1):
+                # Reuse scenes finished by an earlier attempt
+                if manifest and manifest.is_done(i):
+                    entry = manifest.scene(i)
+                    jobs.append((entry["image_file"], entry["audio_file"]))
+                    continue
+                
+                # Scenes sharing a prompt share one image request
+                prompt = scene["image_prompt"]
+                if prompt not in image_futures:
+                    image_futures[prompt] = executor.submit(self.get_scene_image, prompt, image_size)
+                audio_future = executor.submit(self.get_scene_audio, scene["narration"], voice)
+                jobs.append((image_futures[prompt], audio_future))
+            
+            assets = []
+            for i, (image_future, audio_future) in enumerate(jobs, 1):
+                if isinstance(image_future, str):
+                    assets.append((image_future, audio_future))
+                    continue
+                
+                error = "Asset generation failed"
+                try:
+                    image_file = image_future.result()
+                    audio_file = audio_future.result()
+                except Exception as e:
+                    print(f"Scene {i} asset error: {str(e)}")
+                    image_file = audio_file = None
+                    error = str(e)
+                
+                if image_file and audio_file:
+                    assets.append((image_file, audio_file))
+                    if manifest:
+                        manifest.mark_done(i, image_file, audio_file)
+                else:
+                    assets.append(None)
+                    if manifest:
+                        manifest.mark_failed(i, error)
+        
+        return assets
 
-class ImageBasedVideoGenerator(VideoGenerator):
-    """Image-based video generator using OpenAI DALL-E + TTS"""
-    
-    def generate_tts_openai(self, text, output_file, voice="alloy"):
+    def segment_key(self, image_file, audio_file, fps, motion=None, captions=None):
         """
-        Converts text to audio file using OpenAI TTS API.
+        Builds the segment cache key of a scene from everything its encode depends on.
         
         Args:
-            text (str): Text to convert
-            output_file (str): Output audio file path
-            voice (str): Voice model (alloy, echo, fable, onyx, nova, shimmer)
+            image_file (str): Prepared scene image path
+            audio_file (str): Scene audio path
+            fps (int): Frame rate of the segment
+            motion (dict): Motion of the scene, None for a still scene
+            captions (list): Burned-in (overlay_file, start, end) blocks, None for no captions
+        
+        Returns:
+            str: Cache key
         """
+        parts = [SEGMENT_FORMAT, self.encoder, fps, file_sha256(image_file), file_sha256(audio_file)]
+        if motion:
+            parts.append(motion)
+        if captions:
+            # Overlays are named after their content key
+            parts.append([(os.path.basename(overlay_file), round(start, 3), round(end, 3))
+                          for overlay_file, start, end in captions])
+        return AssetCache.make_key(*parts)
+
+    def compose_video(self, scene_assets, output_file, platform_specs=None, work_dir=None, workers=None,
+                      scenes=None, dropped=None):
+        """
+        Composes the final video from per-scene segments encoded in a process pool.
+        
+        Encoded segments are kept in the segment cache, keyed by the content of
+        their prepared image and narration. Only scenes without a cached segment
+        are encoded, by up to encode_workers processes, so re-rendering an edited
+        story re-encodes just the scenes that changed. The segments are then
+        joined with a stream-copy concat.
+        
+        Scenes with a "motion" get a Ken Burns pan or zoom rendered from a
+        pre-scaled copy of their image; the others stay still. The narration of
+        each scene is burned in as captions (see burn_captions) and written to
+        SRT and WebVTT files next to the video.
+        
+        Args:
+            scene_assets (list): (image_file, audio_file) per scene in playback order
+            output_file (str): Output video path
+            platform_specs (dict): Platform specifications
+            work_dir (str): Directory for intermediate segments
+            workers (int): Encode processes, defaults to encode_workers
+            scenes (list): Story scene data matching scene_assets, for per-scene options such as
+                motion and the narration captions
+            dropped (list): Filled with the positions (1-based, in scene_assets) of scenes left
+                out of the video because their image could not be prepared or their segment encoded
+        
+        Returns:
+            bool: True if the video was written
+        """
+        scenes = scenes or [{}] * len(scene_assets)
+        dropped = [] if dropped is None else dropped
+        
+        def prepare(position, assets, scene):
+            image_file, audio_file = assets
+            motion = scene_motion(scene)
+            if motion:
+                prepared_file, size = self.prepare_motion_image(image_file, motion, platform_specs)
+            else:
+                prepared_file = self.prepare_scene_image(image_file, platform_specs)
+                size = self.output_size(prepared_file, platform_specs) if prepared_file else None
+            if not prepared_file:
+                return None
+            
+            duration = self.get_audio_duration(audio_file)
+            narration = scene.get("narration")
+            fps = self.segment_fps(motion)
+            return {
+                "position": position,
+                "image_file": prepared_file,
+                "audio_file": audio_file,
+                "duration": duration,
+                "motion": motion,
+                "size": size,
+                "fps": fps,
+                "captions": self.scene_captions(narration, duration, *size, fps) if narration else []
+            }
+        
+        # Bring every image to the output size once, so encoders never scale frames
+        with metrics.timer("prepare_images"), ThreadPoolExecutor(max_workers=self.encode_workers) as executor:
+            prepared = list(executor.map(prepare, range(1, len(scene_assets) + 1), scene_assets, scenes))
+        dropped += [position for position, scene in enumerate(prepared, 1) if not scene]
+        scenes = [scene for scene in prepared if scene]
+        if not scenes:
+            print("No scene images could be prepared")
+            return False
+        
+        work_dir = work_dir or f"{output_file}.segments"
+        os.makedirs(work_dir, exist_ok=True)
+        
+        # Reuse the segments of scenes whose image and narration are unchanged
+        segment_files = []
+        jobs = []
+        for i, scene in enumerate(scenes, 1):
+            motion = scene["motion"]
+            fps = scene["fps"]
+            captions = [(overlay_file, start, end) for start, end, _, overlay_file in scene["captions"]]
+            if not captions or not all(overlay_file for overlay_file, _, _ in captions):
+                captions = None
+            
+            key = self.segment_key(scene["image_file"], scene["audio_file"], fps, motion, captions)
+            segment_files.append(self.segment_cache.get(key, ".mp4", count=True))
+            if segment_files[-1]:
+                continue
+            jobs.append({
+                "scene": i,
+                "key": key,
+                "encoder": self.encoder,
+                "image_file": scene["image_file"],
+                "audio_file": scene["audio_file"],
+                "output_file": os.path.join(work_dir, f"scene_{i}.mp4"),
+                # Still images already have the output size
+                "width": scene["size"][0] if motion else None,
+                "height": scene["size"][1] if motion else None,
+                "fps": fps,
+                "duration": scene["duration"],
+                "motion": motion,
+                "captions": captions
+            })
+        
         try:
-            if not self.openai_client:
-                raise Exception("OpenAI client not initialized")
+            workers = max(1, min(workers or self.encode_workers, len(jobs)))
+            # Split the cores between concurrent encodes instead of oversubscribing them
+            threads = max(1, available_cpus() // workers)
+            for job in jobs:
+                job["threads"] = threads
+            
+            print(f"Encoding {len(jobs)} of {len(scenes)} scenes with {workers} worker(s)...")
+            with metrics.timer("encode", encoder=self.encoder) as span:
+                # moviepy holds decoded frames in numpy buffers; encoding it in a child process
+                # hands that memory back when the pool exits, so the render process stays flat
+                if jobs and (workers > 1 or self.encoder == "moviepy"):
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=encode_pool_context()) as executor:
+                        futures = [executor.submit(encode_segment, job) for job in jobs]
+                        encoded = self._collect_segments(jobs, futures)
+                else:
+                    encoded = self._collect_segments(jobs)
                 
-            response = self.openai_client.audio.speech.create(
-                model="tts-1",
-                voice=voice,
-                input=text
-            )
+                for job, encoded_file in zip(jobs, encoded):
+                    if encoded_file:
+                        segment_files[job["scene"] - 1] = self.segment_cache.put(job["key"], ".mp4", encoded_file)
+                span.update(scenes=len(scenes), reused=len(scenes) - len(jobs),
+                            encoded=sum(1 for encoded_file in encoded if encoded_file), workers=workers,
+                            motion_scenes=sum(1 for job in jobs if job["motion"]))
+                # Scenes whose segment failed are left out of the video
+                dropped += [scene["position"] for scene, segment_file in zip(scenes, segment_files) if not segment_file]
+                scenes = [scene for scene, segment_file in zip(scenes, segment_files) if segment_file]
+                segment_files = [segment_file for segment_file in segment_files if segment_file]
+                if not segment_files:
+                    span["status"] = "error"
             
-            response.stream_to_file(output_file)
-            print(f"Audio created with OpenAI TTS: {output_file}")
+            if not segment_files:
+                print("No video segments were created")
+                return False
+            
+            with metrics.timer("concat"):
+                concat_segments(segment_files, output_file)
+            
+            self.write_caption_files(scenes, segment_files, output_file)
             return True
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def write_caption_files(self, scenes, segment_files, output_file):
+        """
+        Writes the SRT and WebVTT sidecars of a video, timed from the narration of each scene.
+        
+        Args:
+            scenes (list): Prepared scenes in the video, with their caption blocks
+            segment_files (list): Segment of each scene, whose length offsets the following scenes
+            output_file (str): Video path the sidecars are named after
+        
+        Returns:
+            tuple: (srt_path, vtt_path), or (None, None) if there are no captions or writing failed
+        """
+        cues = []
+        offset = 0.0
+        for scene, segment_file in zip(scenes, segment_files):
+            length = mp4_duration(segment_file) or scene["duration"]
+            blocks = [(start, end, lines) for start, end, lines, _ in scene["captions"]]
+            if blocks:
+                # The last block stays on screen until the segment ends
+                blocks[-1] = (blocks[-1][0], max(blocks[-1][1], length), blocks[-1][2])
+            cues += [(offset + start, offset + end, lines) for start, end, lines in blocks]
+            offset += length
+        if not cues:
+            return None, None
+        
+        srt_file, vtt_file = caption_paths(output_file)
+        try:
+            write_subtitles(cues, srt_file, vtt_file)
+            return srt_file, vtt_file
+        except OSError as e:
+            print(f"Caption file error: {str(e)}")
+            return None, None
+
+    def _collect_segments(self, jobs, futures=None):
+        """
+        Collects encoded segment paths in job order.
+        
+        Args:
+            jobs (list): Encode jobs
+            futures (list): Futures of the jobs from the process pool, None to encode inline
+        
+        Returns:
+            list: Encoded segment path per job, None for scenes that failed
+        """
+        segment_files = []
+        for i, job in enumerate(jobs):
+            try:
+                segment_files.append(futures[i].result() if futures else encode_segment(job))
+            except subprocess.CalledProcessError as e:
+                metrics.increment("stage_failures_total", stage="encode_segment")
+                print(f"Scene {job['scene']} encoding error: {(e.stderr or b'').decode(errors='replace').strip() or e}")
+                segment_files.append(None)
+            except Exception as e:
+                metrics.increment("stage_failures_total", stage="encode_segment")
+                print(f"Scene {job['scene']} encoding error: {str(e)}")
+                segment_files.append(None)
+        return segment_files
+
+    def create_previews(self, scene_assets, output_file, platform_specs=None):
+        """
+        Writes the poster and preview proxy of a rendered video from its prepared scene images.
+        
+        Args:
+            scene_assets (list): (image_file, audio_file) per scene in playback order
+            output_file (str): Full-resolution video path
+            platform_specs (dict): Platform specifications
+        
+        Returns:
+            tuple: (poster_path, preview_path), or (None, None) on failure
+        """
+        poster_file, preview_file = preview_paths(output_file)
+        try:
+            with metrics.timer("previews"):
+                os.makedirs(os.path.dirname(poster_file), exist_ok=True)
+                image_files = [self.prepare_scene_image(image_file, platform_specs) for image_file, _ in scene_assets]
+                scene_assets = [(image_file, audio_file)
+                                for image_file, (_, audio_file) in zip(image_files, scene_assets) if image_file]
+                
+                make_poster(scene_assets[0][0], poster_file, self.preview_max_side)
+                encode_preview(
+                    [image_file for image_file, _ in scene_assets],
+                    [audio_file for _, audio_file in scene_assets],
+                    [self.get_audio_duration(audio_file) for _, audio_file in scene_assets],
+                    preview_file, self.preview_max_side, self.still_fps
+                )
+            return poster_file, preview_file
+        except subprocess.CalledProcessError as e:
+            print(f"Preview creation error: {e.stderr.decode(errors='replace').strip()}")
         except Exception as e:
-            print(f"OpenAI TTS error: {str(e)}")
-            return False
+            print(f"Preview creation error: {str(e)}")
+        return None, None
 
-    def generate_image_with_openai(self, prompt, output_file, image_size="1024x1792"):
+    def process_story_stream(self, story_stream, story_file, output_dir, voice="alloy", platform_specs=None,
+                             timings=None):
         """
-        Creates image using OpenAI DALL-E API.
+        Renders a story while it is still being generated.
+        
+        Image and TTS requests for each scene start as soon as the scene arrives
+        from the stream. When the story is complete it is saved to story_file and
+        rendered as usual; that render finds the assets already in the caches or
+        waits for the requests still in flight.
         
         Args:
-            prompt (str): Image generation prompt
-            output_file (str): Output image file path
-            image_size (str): Image size (1024x1024, 1024x1792, 1792x1024)
+            story_stream (StoryStream): Iterable of scenes exposing the finished story as .story
+            story_file (str): Path the completed story JSON is saved to
+            output_dir (str): Output directory
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
+            timings (dict): Filled with the seconds spent in the 'story', 'assets' and 'encode' stages
+        
+        Returns:
+            tuple: (final_video_path, success_status, story_data)
         """
+        timings = {} if timings is None else timings
+        image_size = self.get_image_size(platform_specs)
+        
         try:
-            if not self.openai_client:
-                raise Exception("OpenAI client not initialized")
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                with self.story_slots or nullcontext():
+                    stage_start = time.perf_counter()
+                    for i, scene in enumerate(story_stream, 1):
+                        print(f"Scene {i} received, starting its assets...")
+                        executor.submit(self.get_scene_image, scene["image_prompt"], image_size)
+                        executor.submit(self.get_scene_audio, scene["narration"], voice)
+                    timings["story"] = time.perf_counter() - stage_start
                 
-            # General prompt enhancement
-            enhanced_prompt = f"""
-            Create a high-quality, engaging illustration for this scene:
-            {prompt}
-            
-            The image should be:
-            - Visually appealing and professional
-            - Clear and easy to understand
-            - Colorful and engaging
-            - Detailed but not cluttered
-            - Consistent with the overall story style
-            """
-            
-            # Send request to OpenAI DALL-E API
-            response = self.openai_client.images.generate(
-                model="dall-e-3",
-                prompt=enhanced_prompt,
-                size=image_size,
-                quality="standard",
-                n=1
-            )
-            
-            # Get image URL
-            image_url = response.data[0].url
-            
-            # Download and save image
-            image_response = requests.get(image_url)
-            if image_response.status_code == 200:
-                with open(output_file, 'wb') as f:
-                    f.write(image_response.content)
-                print(f"Image successfully created: {output_file}")
-                return True
-            else:
-                print("Image could not be downloaded")
-                return False
+                story_data = story_stream.story
+                if not story_data:
+                    print("Story could not be generated")
+                    return None, False, None
                 
+                save_story_to_json(story_data, story_file)
+                final_video_path, success = self.process_story_to_video(story_file, output_dir, voice, platform_specs,
+                                                                        timings=timings)
+                return final_video_path, success, story_data
+        
         except Exception as e:
-            print(f"Image creation error: {str(e)}")
-            return False
+            print(f"Error processing story stream: {str(e)}")
+            return None, False, None
 
-    def create_scene(self, scene_data, scene_number, output_dir, story_context=None, voice="alloy", platform_specs=None):
+    def open_manifest(self, story_data, output_dir, voice="alloy", platform_specs=None):
         """
-        Creates a single scene using OpenAI DALL-E + TTS.
+        Open the checkpoint manifest for rendering a story with the given settings.
         
         Args:
-            scene_data (dict): Scene data
-            scene_number (int): Scene number
+            story_data (dict): Story data
             output_dir (str): Output directory
-            story_context (dict): Story context
             voice (str): Voice for TTS
-            platform_specs (dict): Platform specifications with width, height, etc.
+            platform_specs (dict): Platform specifications
         
         Returns:
-            tuple: (video_clip, duration)
+            RenderManifest: Loaded or new manifest
+        """
+        return RenderManifest.for_render(output_dir, story_data, self.render_settings(voice, platform_specs))
+
+    def render_settings(self, voice="alloy", platform_specs=None):
         """
-        # File paths
-        image_file = os.path.join(output_dir, f"scene_{scene_number}.png")
-        audio_file = os.path.join(output_dir, f"scene_{scene_number}.wav")
+        Collects every setting besides the story that affects the rendered video.
         
-        # Determine image size based on platform specs
-        image_size = "1024x1792"  # Default
+        Only the frame size and the requested image size are taken from the platform
+        specs, so specs that differ in keys the renderer ignores (fps, bitrate, platform
+        names) share one fingerprint.
+        
+        Args:
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
+        
+        Returns:
+            dict: Render settings
+        """
+        frame_size = None
         if platform_specs:
-            width = platform_specs.get('width', 1024)
-            height = platform_specs.get('height', 1792)
-            
-            # Map to supported DALL-E sizes
-            if width == height:  # Square
-                image_size = "1024x1024"
-            elif width > height:  # Landscape
-                image_size = "1792x1024"
-            else:  # Portrait
-                image_size = "1024x1792"
+            frame_size = {
+                "width": platform_specs.get('width', 1080),
+                "height": platform_specs.get('height', 1920)
+            }
+        return {
+            "voice": voice,
+            "platform_specs": frame_size,
+            "image_size": self.get_image_size(platform_specs),
+            "image_model": self.image_model,
+            "image_quality": self.image_quality,
+            "tts_model": self.tts_model,
+            "encoder": self.encoder,
+            "fps": self.segment_fps(),
+            "motion_fps": self.motion_fps,
+            "captions": CAPTION_STYLE if self.burn_captions else None,
+            "segment_format": SEGMENT_FORMAT
+        }
+
+    def retry_failed_scenes(self, story_file, output_dir, voice="alloy", platform_specs=None):
+        """
+        Regenerate only the scenes that failed in the last render of a story, then re-compose it.
         
-        # Create image
-        if not self.generate_image_with_openai(scene_data["image_prompt"], image_file, image_size):
-            return None, 0
+        Scenes whose assets failed and scenes left out of the video (image preparation or
+        encode failures) are both retried; the retry only succeeds once no scene is missing.
         
-        # Create audio
-        if not self.generate_tts_openai(scene_data["narration"], audio_file, voice):
-            return None, 0
+        Args:
+            story_file (str): Path to story JSON file
+            output_dir (str): Output directory
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
         
-        try:
-            # Load audio to get duration
-            audio_clip = AudioFileClip(audio_file)
-            duration = audio_clip.duration
-            
-            # Create image clip with audio duration
-            image_clip = ImageClip(image_file, duration=duration)
-            
-            # Resize image to match platform specs
-            if platform_specs:
-                target_width = platform_specs.get('width', 1080)
-                target_height = platform_specs.get('height', 1920)
-                # Use newsize parameter to avoid PIL.Image.ANTIALIAS deprecation
-                image_clip = image_clip.resize(newsize=(target_width, target_height))
-            
-            # Combine image and audio
-            video_clip = image_clip.set_audio(audio_clip)
-            
-            return video_clip, duration
-            
-        except Exception as e:
-            print(f"Scene creation error: {str(e)}")
-            return None, 0
+        Returns:
+            tuple: (final_video_path, success_status)
+        """
+        with open(story_file, 'r', encoding='utf-8') as f:
+            story_data = json.load(f)
+        
+        manifest = self.open_manifest(story_data, output_dir, voice, platform_specs)
+        # Scenes whose assets failed, and scenes left out of the video when preparing or encoding
+        missing = sorted(set(manifest.failed_scenes()) | set(manifest.data.get("missing_scenes") or []))
+        if manifest.data.get("status") == "complete" and not missing:
+            print("No failed scenes to retry")
+            output_file = manifest.data.get("output_file")
+            return output_file, bool(output_file and os.path.exists(output_file))
+        
+        print(f"Retrying failed scenes: {missing or 'all'}")
+        output_file, success = self.process_story_to_video(story_file, output_dir, voice, platform_specs)
+        # A video that still misses scenes is not a successful retry
+        status = self.open_manifest(story_data, output_dir, voice, platform_specs).data.get("status")
+        return output_file, success and status == "complete"
 
-    def process_story_to_video(self, story_file, output_dir, voice="alloy", platform_specs=None):
+    def process_story_to_video(self, story_file, output_dir, voice="alloy", platform_specs=None, resume=True,
+                               timings=None):
         """
         Process entire story JSON file into a video.
         
+        Progress is checkpointed in a manifest, so re-running the same story with
+        the same settings only regenerates missing or failed scenes.
+        
         Args:
             story_file (str): Path to story JSON file
             output_dir (str): Output directory
             voice (str): Voice for TTS
             platform_specs (dict): Platform specifications
+            resume (bool): Reuse scenes finished by an earlier attempt
+            timings (dict): Filled with the seconds spent in the 'assets' and 'encode' stages
         
         Returns:
             tuple: (final_video_path, success_status)
@@ -200,44 +1556,175 @@ class ImageBasedVideoGenerator(VideoGenerator):
             with open(story_file, 'r', encoding='utf-8') as f:
                 story_data = json.load(f)
             
-            # Create output directory
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Process each scene
-            video_clips = []
-            for i, scene in enumerate(story_data['scenes'], 1):
-                print(f"Processing scene {i}/{len(story_data['scenes'])}...")
-                
-                video_clip, duration = self.create_scene(scene, i, output_dir, story_data, voice, platform_specs)
-                
-                if video_clip:
-                    video_clips.append(video_clip)
-                else:
-                    print(f"Failed to create scene {i}")
-            
-            if video_clips:
-                # Combine all clips
-                final_video = concatenate_videoclips(video_clips)
-                
-                # Save final video
-                safe_title = "".join(c for c in story_data['story_title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                output_file = os.path.join(output_dir, f"{safe_title.replace(' ', '_')}_image_based.mp4")
-                final_video.write_videofile(output_file, fps=24, verbose=False, logger=None)
-                
-                # Clean up
-                for clip in video_clips:
-                    clip.close()
-                final_video.close()
-                
-                print(f"Final video created: {output_file}")
-                return output_file, True
-            else:
-                print("No video clips were created")
-                return None, False
+            return self.render_story(story_data, output_dir, voice, platform_specs, resume, timings)
                 
         except Exception as e:
             print(f"Error processing story to video: {str(e)}")
             return None, False
+        finally:
+            metrics.export()
+
+    def process_story_to_video_multi(self, story_file, output_dir, voice="alloy", platform_specs_list=None, resume=True):
+        """
+        Renders one story for several platform specs (e.g. 9:16, 1:1 and 16:9) in a single job.
+        
+        All targets run concurrently and share the asset caches, so each narration
+        is generated once and each distinct DALL-E size once. The encode workers
+        are split between the targets.
+        
+        Args:
+            story_file (str): Path to story JSON file
+            output_dir (str): Output directory
+            voice (str): Voice for TTS
+            platform_specs_list (list): Platform specifications, one per target
+            resume (bool): Reuse scenes finished by an earlier attempt
+        
+        Returns:
+            dict: Target size (WIDTHxHEIGHT) mapped to its video path, None for failed targets
+                (invalid specs are reported as target_<n>)
+        """
+        try:
+            with open(story_file, 'r', encoding='utf-8') as f:
+                story_data = json.load(f)
+        except Exception as e:
+            print(f"Error processing story to video: {str(e)}")
+            return {}
+        
+        # Keyed by size: two targets can share an aspect ratio (e.g. 1080x1920 and 720x1280)
+        targets = {}
+        results = {}
+        for i, specs in enumerate(platform_specs_list or [None], 1):
+            specs = specs or {'width': 1024, 'height': 1792}
+            try:
+                # Same defaults as the scene images are prepared with
+                name = f"{specs.get('width', 1080)}x{specs.get('height', 1920)}"
+            except AttributeError:
+                print(f"Skipping target {i}: platform specs must be a dict, got {specs!r}")
+                results[f"target_{i}"] = None
+                continue
+            if name in targets and targets[name] != specs:
+                print(f"Skipping target {name}: another target already renders that size")
+                continue
+            targets[name] = specs
+        if not targets:
+            return results
+        
+        encode_workers = max(1, self.encode_workers // len(targets))
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = {
+                name: executor.submit(
+                    self.render_story, story_data, output_dir, voice, specs, resume, None, name, encode_workers
+                )
+                for name, specs in targets.items()
+            }
+            for name, future in futures.items():
+                try:
+                    output_file, success = future.result()
+                except Exception as e:
+                    print(f"Target {name} error: {str(e)}")
+                    output_file, success = None, False
+                results[name] = output_file if success else None
+        
+        metrics.export()
+        return results
+
+    def render_story(self, story_data, output_dir, voice="alloy", platform_specs=None, resume=True, timings=None,
+                     output_tag=None, encode_workers=None):
+        """
+        Renders loaded story data into a video for one set of platform specs.
+        
+        The video is named after the story title and the render fingerprint, so
+        renders with different settings never overwrite each other. If the same
+        story was already rendered with the same settings and the video is still
+        on disk, that video is returned without rendering.
+        
+        Args:
+            story_data (dict): Story data
+            output_dir (str): Output directory
+            voice (str): Voice for TTS
+            platform_specs (dict): Platform specifications
+            resume (bool): Reuse earlier renders and scenes finished by an earlier attempt
+            timings (dict): Filled with the seconds spent in the 'assets' and 'encode' stages
+            output_tag (str): Appended to the video file name to tell several targets apart
+            encode_workers (int): Encode processes for this render, defaults to encode_workers
+        
+        Returns:
+            tuple: (final_video_path, success_status)
+        """
+        timings = {} if timings is None else timings
+        
+        # Create output directory
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Load checkpoint of earlier attempts
+        manifest = self.open_manifest(story_data, output_dir, voice, platform_specs)
+        if not resume:
+            manifest.reset()
+        
+        # Return the video of an identical earlier render
+        existing_file = self.render_index.lookup(manifest.render_id) if resume else None
+        metrics.increment("cache_lookups_total", cache="renders", result="hit" if existing_file else "miss")
+        if existing_file:
+            print(f"Identical render found: {existing_file}")
+            return existing_file, True
+        
+        # Generate all scene assets concurrently
+        total_scenes = len(story_data['scenes'])
+        with self.asset_slots or nullcontext():
+            print(f"Generating assets for {total_scenes} scenes (max {self.max_concurrency} concurrent requests)...")
+            stage_start = time.perf_counter()
+            with metrics.timer("assets") as span:
+                assets = self.generate_scene_assets(story_data['scenes'], output_dir, voice, platform_specs, manifest)
+                span.update(scenes=total_scenes, failed_scenes=sum(1 for assets_of_scene in assets if not assets_of_scene))
+            timings["assets"] = time.perf_counter() - stage_start
+        print(f"Image cache: {self.image_cache.stats()}, audio cache: {self.audio_cache.stats()}")
+        
+        scene_assets = []
+        scenes = []
+        scene_numbers = []
+        for i, (assets_of_scene, scene) in enumerate(zip(assets, story_data['scenes']), 1):
+            if assets_of_scene:
+                scene_assets.append(assets_of_scene)
+                scenes.append(scene)
+                scene_numbers.append(i)
+            else:
+                metrics.increment("stage_failures_total", stage="scene")
+                print(f"Failed to create scene {i}")
+        
+        if not scene_assets:
+            print("No video clips were created")
+            return None, False
+        
+        # Save final video
+        safe_title = "".join(c for c in story_data['story_title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        file_name = f"{safe_title.replace(' ', '_')}_image_based"
+        if output_tag:
+            file_name += f"_{output_tag}"
+        file_name += f"_{manifest.render_id[:8]}"
+        output_file = os.path.join(output_dir, f"{file_name}.mp4")
+        
+        work_dir = os.path.join(output_dir, "segments", manifest.render_id)
+        dropped = []
+        with self.encode_slots or nullcontext():
+            stage_start = time.perf_counter()
+            with metrics.timer("compose") as span:
+                composed = self.compose_video(scene_assets, output_file, platform_specs, work_dir, encode_workers,
+                                              scenes, dropped)
+                if not composed:
+                    span["status"] = "error"
+            timings["encode"] = time.perf_counter() - stage_start
+        if not composed:
+            return None, False
+        
+        # Small poster and preview so the UI never has to load the full file
+        self.create_previews(scene_assets, output_file, platform_specs)
+        
+        manifest.mark_complete(output_file, [scene_numbers[position - 1] for position in dropped])
+        # Renders with missing scenes are not reused, so asking again retries them
+        if manifest.data["status"] == "complete":
+            self.render_index.record(manifest.render_id, output_file, manifest.data["settings"])
+        print(f"Final video created: {output_file}")
+        return output_file, True
 
 
 
@@ -259,7 +1746,7 @@ def create_video_generator(method, openai_api_key=None, gemini_api_key=None):
         VideoGenerator: Appropriate generator instance
     """
     if method == 'image_based':
-        return ImageBasedVideoGenerator(openai_api_key, gemini_api_key)
+        return ImageBasedVideoGenerator(openai_api_key)
 
 
     else:
@@ -297,9 +1784,36 @@ def get_model_info(method):
     return model_info.get(method, {"error": "Unknown method"})
 
 # Convenience functions for backward compatibility
-def process_story_to_videos_image_based(openai_api_key, story_file, output_dir, voice="alloy", platform_specs=None):
+_generators = {}
+_generators_lock = threading.Lock()
+
+
+def get_image_based_generator(openai_api_key=None, max_concurrency=4, image_response_format="url"):
+    """
+    Returns a generator shared by all jobs with the same key, concurrency and image response format.
+    
+    Reusing the generator keeps its OpenAI client, HTTP connections and cache
+    counters alive between jobs.
+    
+    Args:
+        openai_api_key (str): OpenAI API key
+        max_concurrency (int): Maximum number of image/TTS requests in flight at once
+        image_response_format (str): 'url' or 'b64_json', see ImageBasedVideoGenerator
+    
+    Returns:
+        ImageBasedVideoGenerator: Shared generator
+    """
+    key = (openai_api_key or OPENAI_API_KEY, max_concurrency, image_response_format)
+    with _generators_lock:
+        if key not in _generators:
+            _generators[key] = ImageBasedVideoGenerator(openai_api_key, max_concurrency=max_concurrency,
+                                                        image_response_format=image_response_format)
+        return _generators[key]
+
+
+def process_story_to_videos_image_based(openai_api_key, story_file, output_dir, voice="alloy", platform_specs=None, max_concurrency=4):
     """Backward compatibility function for image-based video generation"""
-    generator = ImageBasedVideoGenerator(openai_api_key)
+    generator = get_image_based_generator(openai_api_key, max_concurrency)
     return generator.process_story_to_video(story_file, output_dir, voice, platform_specs)
 
 